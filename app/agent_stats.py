@@ -0,0 +1,114 @@
+"""
+Incrementally maintained per-agent stats.
+
+The ``agent_stats`` row for an agent is adjusted in the same transaction as
+the write that changes it: market creation, casting or removing a vote, and
+market resolution. Profile and listing endpoints read it with a single join.
+
+Backfill or repair with:  python -m app.agent_stats rebuild
+"""
+import sys
+
+from sqlalchemy import case, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from app.database import dialect_insert
+from app.models import Agent, AgentStats, Market, MarketVote, MarketStatus
+
+COUNTERS = ("markets_created", "votes_cast", "total_votes", "correct_predictions")
+
+
+def bump(db: Session, agent_id: str, **deltas: int) -> None:
+    """Add deltas (e.g. votes_cast=1) to an agent's counters, creating the row if needed."""
+    table = AgentStats.__table__
+    stmt = dialect_insert(db, table).values(
+        agent_id=agent_id,
+        **{c: max(deltas.get(c, 0), 0) for c in COUNTERS},
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["agent_id"],
+        set_={c: table.c[c] + d for c, d in deltas.items()},
+    )
+    db.execute(stmt)
+
+
+def record_resolution(db: Session, market: Market) -> None:
+    """
+    Credit every voter on a just-resolved market. Call once per market, after
+    claiming the resolution (see resolve_market); the caller commits.
+    """
+    table = AgentStats.__table__
+    correct = case((MarketVote.outcome_id == market.winning_outcome_id, 1), else_=0)
+    rows = select(
+        MarketVote.agent_id, literal(0), literal(0), literal(1), correct,
+    ).where(MarketVote.market_id == market.id)
+    stmt = dialect_insert(db, table).from_select(["agent_id", *COUNTERS], rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["agent_id"],
+        set_={
+            "total_votes": table.c.total_votes + stmt.excluded.total_votes,
+            "correct_predictions": table.c.correct_predictions + stmt.excluded.correct_predictions,
+        },
+    )
+    db.execute(stmt)
+
+
+def rebuild(db: Session, batch_size: int = 5000) -> int:
+    """Recompute every agent's counters from markets and votes. Returns rows written."""
+    markets_created = dict(
+        db.query(Market.agent_id, func.count(Market.id)).group_by(Market.agent_id).all()
+    )
+    votes_cast = dict(
+        db.query(MarketVote.agent_id, func.count(MarketVote.id)).group_by(MarketVote.agent_id).all()
+    )
+    resolved = {
+        agent_id: (total, correct or 0)
+        for agent_id, total, correct in (
+            db.query(
+                MarketVote.agent_id,
+                func.count(MarketVote.id),
+                func.sum(case((MarketVote.outcome_id == Market.winning_outcome_id, 1), else_=0)),
+            )
+            .join(Market, Market.id == MarketVote.market_id)
+            .filter(Market.status == MarketStatus.RESOLVED)
+            .group_by(MarketVote.agent_id)
+            .all()
+        )
+    }
+
+    db.query(AgentStats).delete()
+    written = 0
+    batch = []
+    for (agent_id,) in db.query(Agent.id).yield_per(batch_size):
+        total, correct = resolved.get(agent_id, (0, 0))
+        batch.append({
+            "agent_id": agent_id,
+            "markets_created": markets_created.get(agent_id, 0),
+            "votes_cast": votes_cast.get(agent_id, 0),
+            "total_votes": total,
+            "correct_predictions": correct,
+        })
+        if len(batch) >= batch_size:
+            db.execute(insert(AgentStats), batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        db.execute(insert(AgentStats), batch)
+        written += len(batch)
+    db.commit()
+    return written
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        print("Usage: python -m app.agent_stats rebuild")
+        sys.exit(1)
+    from app import migrations
+    from app.database import SessionLocal, engine
+    migrations.upgrade(engine)
+    session = SessionLocal()
+    try:
+        written = rebuild(session)
+        print(f"Agent stats rebuilt: {written} rows")
+    finally:
+        session.close()
@@ -1,16 +1,67 @@
 from __future__ import annotations
 from typing import Optional
 from fastapi import Header, HTTPException, Depends
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from app.cache import TTLCache, hash_key
+from app.config import (
+    MOLTBOOK_KEY_CACHE_SIZE, MOLTBOOK_KEY_CACHE_TTL,
+    API_KEY_CACHE_SIZE, API_KEY_CACHE_TTL,
+)
+from app.database import get_async_db
 from app.models import Agent
 
+# sha256(Moltbook API key) -> local Agent.id, or InvalidMoltbookKey for keys
+# Moltbook rejected. Lets repeat Moltbook votes skip the remote get_me call.
+moltbook_key_cache = TTLCache(maxsize=MOLTBOOK_KEY_CACHE_SIZE, ttl=MOLTBOOK_KEY_CACHE_TTL)
+
+
+class InvalidMoltbookKey:
+    def __init__(self, message: str):
+        self.message = message
+
+
+def forget_moltbook_key(moltbook_api_key: Optional[str]) -> None:
+    if moltbook_api_key:
+        moltbook_key_cache.pop(hash_key(moltbook_api_key))
+
+
+# sha256(API key) -> detached snapshot of the Agent row, so authenticated
+# requests skip the agents lookup. Endpoints that change an agent must call
+# forget_api_key so this process stops serving the old row.
+api_key_cache = TTLCache(maxsize=API_KEY_CACHE_SIZE, ttl=API_KEY_CACHE_TTL)
+
+
+def forget_api_key(api_key: Optional[str]) -> None:
+    if api_key:
+        api_key_cache.pop(hash_key(api_key))
+
+
+def _snapshot(agent: Agent) -> Agent:
+    copy = Agent(**{c.key: getattr(agent, c.key) for c in Agent.__table__.columns})
+    make_transient_to_detached(copy)
+    return copy
+
+
+async def _agent_by_api_key(db: AsyncSession, api_key: str) -> Optional[Agent]:
+    cache_key = hash_key(api_key)
+    cached = api_key_cache.get(cache_key)
+    if cached is not None:
+        # Attach a copy of the snapshot to this session without a SELECT
+        return await db.merge(cached, load=False)
+    result = await db.execute(select(Agent).where(Agent.api_key == api_key))
+    agent = result.scalar_one_or_none()
+    if agent:
+        api_key_cache.set(cache_key, _snapshot(agent))
+    return agent
+
 
 async def get_current_agent(
     x_api_key: str = Header(..., alias="X-API-Key"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> Agent:
-    agent = db.query(Agent).filter(Agent.api_key == x_api_key).first()
+    agent = await _agent_by_api_key(db, x_api_key)
     if not agent:
         raise HTTPException(status_code=401, detail="Invalid API key")
     if not agent.is_active:
@@ -20,11 +71,11 @@ async def get_current_agent(
 
 async def get_optional_agent(
     x_api_key: str = Header(None, alias="X-API-Key"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> Optional[Agent]:
     if not x_api_key:
         return None
-    agent = db.query(Agent).filter(Agent.api_key == x_api_key).first()
+    agent = await _agent_by_api_key(db, x_api_key)
     if agent and not agent.is_active:
         return None
     return agent
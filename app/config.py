@@ -5,3 +5,74 @@ load_dotenv()
 
 PLATFORM_ADMIN_KEY = os.getenv("PLATFORM_ADMIN_KEY", "")
 CSB_MOLTBOOK_API_KEY = os.getenv("CSB_MOLTBOOK_API_KEY", "")
+
+# Shared Moltbook HTTP connection pool
+MOLTBOOK_MAX_CONNECTIONS = int(os.getenv("MOLTBOOK_MAX_CONNECTIONS", "50"))
+MOLTBOOK_MAX_KEEPALIVE = int(os.getenv("MOLTBOOK_MAX_KEEPALIVE", "20"))
+MOLTBOOK_KEEPALIVE_EXPIRY = float(os.getenv("MOLTBOOK_KEEPALIVE_EXPIRY", "30"))
+MOLTBOOK_HTTP2 = os.getenv("MOLTBOOK_HTTP2", "1") == "1"
+
+# Circuit breaker and per-request time budget for Moltbook-dependent endpoints
+MOLTBOOK_BREAKER_FAILURES = int(os.getenv("MOLTBOOK_BREAKER_FAILURES", "5"))
+MOLTBOOK_BREAKER_RESET = float(os.getenv("MOLTBOOK_BREAKER_RESET", "30"))
+MOLTBOOK_REQUEST_BUDGET = float(os.getenv("MOLTBOOK_REQUEST_BUDGET", "8"))
+
+# API key -> agent cache used by authentication. Per process, so a change
+# made through another worker is seen after at most API_KEY_CACHE_TTL seconds.
+API_KEY_CACHE_SIZE = int(os.getenv("API_KEY_CACHE_SIZE", "10000"))
+API_KEY_CACHE_TTL = float(os.getenv("API_KEY_CACHE_TTL", "60"))
+
+# Verified Moltbook key -> local agent, for the vote-by-Moltbook path
+MOLTBOOK_KEY_CACHE_SIZE = int(os.getenv("MOLTBOOK_KEY_CACHE_SIZE", "10000"))
+MOLTBOOK_KEY_CACHE_TTL = float(os.getenv("MOLTBOOK_KEY_CACHE_TTL", "300"))
+MOLTBOOK_KEY_NEGATIVE_TTL = float(os.getenv("MOLTBOOK_KEY_NEGATIVE_TTL", "60"))
+
+# Seconds a CDN may serve a cached anonymous market read before revalidating
+MARKET_CDN_MAX_AGE = int(os.getenv("MARKET_CDN_MAX_AGE", "5"))
+
+# Responses at least this many bytes are gzip/brotli compressed when the client accepts it
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+# Rendered embed widget HTML, keyed by market version
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "2000"))
+EMBED_CACHE_TTL = float(os.getenv("EMBED_CACHE_TTL", "30"))
+
+# Prometheus metrics at /metrics. When METRICS_TOKEN is set, scrapes must
+# send it as "Authorization: Bearer <token>".
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Debug/CI: add X-DB-Queries headers and log statements repeated at least
+# QUERY_REPEAT_THRESHOLD times in one request (likely N+1 loops)
+QUERY_DEBUG = os.getenv("QUERY_DEBUG", "") == "1"
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "3"))
+
+# Apply pending schema migrations at boot. Set to 0 when migrations run
+# before each rollout (python -m app.migrations upgrade); a replica then
+# refuses to start against an out-of-date schema instead of running DDL.
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "1") == "1"
+
+# SQLite (no DATABASE_URL): pooled reader connections per engine, and how
+# long a vote may queue for the single writer thread before getting a 503.
+# Pragmas applied to every connection: busy_timeout, mmap_size, cache_size.
+SQLITE_READERS = int(os.getenv("SQLITE_READERS", "8"))
+SQLITE_WRITE_QUEUE_TIMEOUT = float(os.getenv("SQLITE_WRITE_QUEUE_TIMEOUT", "10"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+
+# Crosspost outbox worker (python -m app.crosspost worker)
+CROSSPOST_BATCH_SIZE = int(os.getenv("CROSSPOST_BATCH_SIZE", "20"))
+CROSSPOST_CONCURRENCY = int(os.getenv("CROSSPOST_CONCURRENCY", "4"))
+CROSSPOST_POLL_INTERVAL = float(os.getenv("CROSSPOST_POLL_INTERVAL", "5"))
+CROSSPOST_MAX_ATTEMPTS = int(os.getenv("CROSSPOST_MAX_ATTEMPTS", "8"))
+CROSSPOST_RETRY_BASE = float(os.getenv("CROSSPOST_RETRY_BASE", "30"))
+CROSSPOST_RETRY_MAX = float(os.getenv("CROSSPOST_RETRY_MAX", "3600"))
+# Seconds one market's posts may run before the rest are cancelled
+CROSSPOST_DEADLINE = float(os.getenv("CROSSPOST_DEADLINE", "30"))
+# Seconds a worker holds claimed rows. Never shorter than the slowest
+# possible batch (ceil(batch / concurrency) deadlines plus a margin), so a
+# second worker can't re-claim rows still being delivered; set to hold longer.
+CROSSPOST_LEASE = float(os.getenv("CROSSPOST_LEASE") or "0")
+# Run the worker inside the web process too, for single-process deploys
+CROSSPOST_WORKER_IN_PROCESS = os.getenv("CROSSPOST_WORKER_IN_PROCESS", "") == "1"
@@ -0,0 +1,312 @@
+"""
+Crossposting markets to Moltbook outside the request path.
+
+``create_market`` writes a ``crosspost_outbox`` row in the same transaction
+as the market; the outbox worker delivers those rows in batches and
+reschedules failures with exponential backoff, so nothing is lost when the
+web process restarts. Run it with:  python -m app.crosspost worker
+
+``markets.crossposted_at`` records which markets have been announced, so the
+admin crosspost-all job can be rerun after an interruption and only picks
+up markets that have not been posted yet. It skips markets the outbox
+still has pending, so a new market is never posted by both.
+"""
+import asyncio
+import logging
+import math
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, exists, select, update
+from sqlalchemy.orm import selectinload
+
+from app.config import (
+    CSB_MOLTBOOK_API_KEY, CROSSPOST_BATCH_SIZE, CROSSPOST_CONCURRENCY,
+    CROSSPOST_POLL_INTERVAL, CROSSPOST_MAX_ATTEMPTS, CROSSPOST_RETRY_BASE,
+    CROSSPOST_RETRY_MAX, CROSSPOST_LEASE, CROSSPOST_DEADLINE,
+)
+from app.database import AsyncSessionLocal
+from app.models import CrosspostOutbox, Market
+from app.moltbook_client import MoltbookClient
+
+logger = logging.getLogger("clawstreetbets.crosspost")
+
+
+def _crosspost_payload(market: Market) -> Dict[str, Any]:
+    return {
+        "title": market.title,
+        "market_id": market.id,
+        "outcomes": [o.label for o in sorted(market.outcomes, key=lambda x: x.sort_order)],
+        "description": market.description or "",
+        "category": market.category or "",
+    }
+
+
+async def mark_crossposted(market_ids: List[str]) -> None:
+    if not market_ids:
+        return
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(Market).where(Market.id.in_(market_ids))
+            .values(crossposted_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        # Outbox rows the worker gave up on are settled now too
+        await db.execute(
+            delete(CrosspostOutbox).where(CrosspostOutbox.market_id.in_(market_ids))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+
+class CrosspostAllJob:
+    """Progress of the single in-process crosspost-all run."""
+
+    def __init__(self):
+        self.status = "idle"
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.posted = 0
+        self.failed = 0
+        self.last_market_id: Optional[str] = None
+        self.errors: List[Dict[str, str]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "posted": self.posted,
+            "failed": self.failed,
+            "last_market_id": self.last_market_id,
+            "recent_errors": self.errors[-20:],
+        }
+
+    def start(self, api_key: str, chunk_size: int = 50, concurrency: int = 4) -> None:
+        if self.running:
+            return
+        self.__init__()
+        self.status = "running"
+        self.started_at = datetime.utcnow()
+        self._task = asyncio.create_task(self._run(api_key, chunk_size, concurrency))
+
+    async def _run(self, api_key: str, chunk_size: int, concurrency: int) -> None:
+        client = MoltbookClient(api_key)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def post(market: Dict[str, Any]) -> bool:
+            async with semaphore:
+                try:
+                    results = await client.crosspost_market(**market)
+                except Exception as e:
+                    results = [{"ok": False, "error": str(e)}]
+                if any(r["ok"] for r in results):
+                    self.posted += 1
+                    return True
+                self.failed += 1
+                self.errors.append({
+                    "market_id": market["market_id"],
+                    "error": "; ".join(r.get("error", "") for r in results),
+                })
+                return False
+
+        try:
+            after = ""
+            while True:
+                # Keyset over id, reading only markets not yet crossposted.
+                # Markets still pending in the outbox are left to the worker.
+                async with AsyncSessionLocal() as db:
+                    pending = exists().where(
+                        CrosspostOutbox.market_id == Market.id, CrosspostOutbox.gave_up_at.is_(None),
+                    )
+                    rows = (await db.execute(
+                        select(Market)
+                        .options(selectinload(Market.outcomes))
+                        .where(Market.crossposted_at.is_(None), ~pending, Market.id > after)
+                        .order_by(Market.id)
+                        .limit(chunk_size)
+                    )).scalars().all()
+                    chunk = [_crosspost_payload(m) for m in rows]
+                if not chunk:
+                    break
+                ok = await asyncio.gather(*(post(m) for m in chunk))
+                await mark_crossposted([m["market_id"] for m, done in zip(chunk, ok) if done])
+                after = self.last_market_id = chunk[-1]["market_id"]
+            self.status = "finished"
+        except Exception as e:
+            logger.exception("Crosspost-all job failed")
+            self.status = "failed"
+            self.errors.append({"market_id": self.last_market_id or "", "error": str(e)})
+        finally:
+            self.finished_at = datetime.utcnow()
+            logger.info(f"Crosspost-all {self.status}: {self.posted} posted, {self.failed} failed")
+
+
+crosspost_all_job = CrosspostAllJob()
+
+
+# --- Outbox ---------------------------------------------------------------
+
+def retry_delay(attempts: int) -> float:
+    """Seconds to wait before retry number ``attempts`` (1-based)."""
+    return min(CROSSPOST_RETRY_BASE * 2 ** (attempts - 1), CROSSPOST_RETRY_MAX)
+
+
+def lease_seconds(batch_size: int, concurrency: int) -> float:
+    """How long a claimed batch is held: at least as long as it can possibly take to deliver."""
+    slowest_batch = math.ceil(batch_size / concurrency) * CROSSPOST_DEADLINE
+    return max(CROSSPOST_LEASE, slowest_batch + 60)
+
+
+async def _claim_batch(batch_size: int, lease: float) -> List[Dict[str, Any]]:
+    """
+    Lease up to ``batch_size`` due outbox rows by pushing their next_attempt_at
+    past the lease, so a crashed worker's rows become due again by themselves.
+    The lease is a conditional UPDATE returning the rows it changed, so when
+    two workers race for the same rows (SQLite has no SKIP LOCKED) each row
+    goes to exactly one of them.
+    """
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        due = (
+            CrosspostOutbox.gave_up_at.is_(None),
+            CrosspostOutbox.next_attempt_at <= now,
+        )
+        candidates = (
+            select(CrosspostOutbox.id).where(*due)
+            .order_by(CrosspostOutbox.next_attempt_at)
+            .limit(batch_size)
+        )
+        if db.get_bind().dialect.name == "postgresql":
+            candidates = candidates.with_for_update(skip_locked=True)
+        ids = (await db.execute(candidates)).scalars().all()
+        if not ids:
+            return []
+        ids = (await db.execute(
+            update(CrosspostOutbox).where(CrosspostOutbox.id.in_(ids), *due)
+            .values(next_attempt_at=now + timedelta(seconds=lease))
+            .returning(CrosspostOutbox.id)
+            .execution_options(synchronize_session=False)
+        )).scalars().all()
+        if not ids:
+            await db.commit()
+            return []
+        rows = (await db.execute(
+            select(CrosspostOutbox)
+            .options(selectinload(CrosspostOutbox.market).selectinload(Market.outcomes))
+            .where(CrosspostOutbox.id.in_(ids))
+        )).scalars().all()
+        batch = [
+            {
+                "id": r.id,
+                "attempts": r.attempts,
+                # Deleted, or already announced (e.g. by crosspost-all): nothing to post
+                "market": _crosspost_payload(r.market) if r.market and r.market.crossposted_at is None else None,
+            }
+            for r in rows
+        ]
+        await db.commit()
+    return batch
+
+
+async def drain_outbox_once(
+    client: MoltbookClient,
+    batch_size: int = CROSSPOST_BATCH_SIZE,
+    concurrency: int = CROSSPOST_CONCURRENCY,
+) -> int:
+    """Deliver one batch of due outbox rows. Returns how many rows were claimed."""
+    batch = await _claim_batch(batch_size, lease_seconds(batch_size, concurrency))
+    if not batch:
+        return 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def deliver(entry: Dict[str, Any]) -> Optional[str]:
+        """None on success, otherwise the error to record."""
+        if entry["market"] is None:
+            return None  # the row is just deleted
+        async with semaphore:
+            try:
+                results = await client.crosspost_market(**entry["market"], deadline=CROSSPOST_DEADLINE)
+            except Exception as e:
+                return str(e)
+        if any(r["ok"] for r in results):
+            return None
+        return "; ".join(r.get("error", "") for r in results) or "no submolts accepted the post"
+
+    errors = await asyncio.gather(*(deliver(e) for e in batch))
+
+    now = datetime.utcnow()
+    delivered = [e for e, err in zip(batch, errors) if err is None]
+    async with AsyncSessionLocal() as db:
+        if delivered:
+            await db.execute(
+                delete(CrosspostOutbox)
+                .where(CrosspostOutbox.id.in_([e["id"] for e in delivered]))
+                .execution_options(synchronize_session=False)
+            )
+            await db.execute(
+                update(Market)
+                .where(Market.id.in_([e["market"]["market_id"] for e in delivered if e["market"]]))
+                .values(crossposted_at=now)
+                .execution_options(synchronize_session=False)
+            )
+        for entry, err in zip(batch, errors):
+            if err is None:
+                continue
+            attempts = entry["attempts"] + 1
+            values = {"attempts": attempts, "last_error": err[:1000]}
+            if attempts >= CROSSPOST_MAX_ATTEMPTS:
+                values["gave_up_at"] = now
+                logger.warning(f"Giving up on crosspost {entry['id']} after {attempts} attempts: {err}")
+            else:
+                values["next_attempt_at"] = now + timedelta(seconds=retry_delay(attempts))
+            await db.execute(
+                update(CrosspostOutbox).where(CrosspostOutbox.id == entry["id"]).values(**values)
+                .execution_options(synchronize_session=False)
+            )
+        await db.commit()
+    logger.info(f"Crosspost outbox: {len(delivered)} delivered, {len(batch) - len(delivered)} rescheduled")
+    return len(batch)
+
+
+async def run_outbox_worker(api_key: str = CSB_MOLTBOOK_API_KEY) -> None:
+    """Drain the outbox forever, sleeping only when nothing is due."""
+    client = MoltbookClient(api_key)
+    while True:
+        try:
+            claimed = await drain_outbox_once(client)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Crosspost outbox batch failed")
+            claimed = 0
+        if claimed < CROSSPOST_BATCH_SIZE:
+            await asyncio.sleep(CROSSPOST_POLL_INTERVAL)
+
+
+async def _worker_main() -> None:
+    from app import moltbook_client
+    from app.database import async_engine
+    await moltbook_client.open_http_client()
+    try:
+        await run_outbox_worker()
+    finally:
+        await moltbook_client.close_http_client()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["worker"]:
+        print("Usage: python -m app.crosspost worker")
+        sys.exit(1)
+    if not CSB_MOLTBOOK_API_KEY:
+        print("CSB_MOLTBOOK_API_KEY not set; nothing to crosspost")
+        sys.exit(1)
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_worker_main())
@@ -1,30 +1,97 @@
+import asyncio
+import contextvars
 import os
-from sqlalchemy import create_engine
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.config import (
+    SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHE_SIZE_KB, SQLITE_MMAP_SIZE, SQLITE_READERS, SQLITE_WRITE_QUEUE_TIMEOUT,
+)
 
 DATABASE_URL = os.getenv("DATABASE_URL", "")
 
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run alongside the writer; with synchronous=NORMAL a
+    # power loss can drop the last commits but never corrupts the file
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.close()
+
+
+def _sqlite_manual_transactions(dbapi_connection, connection_record):
+    # Stop the driver issuing its own BEGIN so _sqlite_begin_immediate can
+    dbapi_connection.isolation_level = None
+
+
+def _sqlite_begin_immediate(conn):
+    conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
 if DATABASE_URL:
     # Railway Postgres: fix scheme if needed (Railway uses postgres://, SQLAlchemy needs postgresql://)
     if DATABASE_URL.startswith("postgres://"):
         DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
-    engine = create_engine(
-        DATABASE_URL,
+    pool_args = dict(
         pool_pre_ping=True,
         pool_size=10,
         max_overflow=20,
         pool_recycle=1800,
     )
+    engine = create_engine(DATABASE_URL, **pool_args)
+    async_engine = create_async_engine(
+        DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1), **pool_args,
+    )
+    write_engine: Optional[Engine] = None
 else:
-    # Local dev: SQLite
+    # Local dev and single-node deployments: SQLite
     DATABASE_DIR = os.getenv("DATABASE_DIR", ".")
     SQLALCHEMY_DATABASE_URL = f"sqlite:///{DATABASE_DIR}/clawstreetbets.db"
+    reader_args = dict(pool_size=SQLITE_READERS, max_overflow=SQLITE_READERS)
     engine = create_engine(
         SQLALCHEMY_DATABASE_URL,
         connect_args={"check_same_thread": False},
+        **reader_args,
+    )
+    # aiosqlite defaults to a fresh connection per session; keep them, pragmas and all
+    async_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{DATABASE_DIR}/clawstreetbets.db", poolclass=AsyncAdaptedQueuePool, **reader_args,
+    )
+    # SQLite allows one writer at a time. Vote writes run one after another
+    # on a dedicated thread with its own connection (see run_write), each
+    # transaction start to commit without waiting on the event loop, so the
+    # write lock is held only as long as the statements take
+    write_engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        pool_size=1, max_overflow=0,
     )
+    for _engine in (engine, async_engine.sync_engine, write_engine):
+        event.listen(_engine, "connect", _sqlite_pragmas)
+    # Take the write lock when the transaction starts, not at its first
+    # write, so a writer in another process makes it wait (busy_timeout)
+    # rather than fail on a stale read snapshot
+    event.listen(write_engine, "connect", _sqlite_manual_transactions)
+    event.listen(write_engine, "begin", _sqlite_begin_immediate)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Used by the async route handlers so DB I/O never blocks the event loop.
+# Objects stay usable after commit because responses are built from them.
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+# SQLite only: sessions on the writer connection, and the thread that owns it
+WriteSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=write_engine) if write_engine else None
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer") if write_engine else None
 
 Base = declarative_base()
 
@@ -35,3 +102,46 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+class WriteQueueTimeout(Exception):
+    """A write waited longer than SQLITE_WRITE_QUEUE_TIMEOUT for the writer thread."""
+
+
+def _write_in_writer_thread(queued_at: float, fn: Callable[..., Any], args: tuple) -> Any:
+    if time.monotonic() - queued_at > SQLITE_WRITE_QUEUE_TIMEOUT:
+        raise WriteQueueTimeout()  # the caller has likely given up; don't write behind its back
+    db = WriteSessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+async def run_write(db: AsyncSession, fn: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run ``fn(session, *args)``, which commits its own writes. On SQLite it
+    queues for the writer thread and gets that thread's session; on Postgres
+    it runs on ``db`` like any other run_sync call.
+    """
+    if _writer is None:
+        return await db.run_sync(fn, *args)
+    # Copy the context so the statements count towards the request's query stats
+    job = contextvars.copy_context().run
+    return await asyncio.get_running_loop().run_in_executor(
+        _writer, job, _write_in_writer_thread, time.monotonic(), fn, args,
+    )
+
+
+def dialect_insert(db, table):
+    """INSERT construct supporting on_conflict_do_update for the bound dialect."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
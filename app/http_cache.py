@@ -0,0 +1,48 @@
+"""
+Conditional GET helpers for market reads.
+
+ETags are derived from ``markets.version``, which every vote, close and
+resolve bumps, so a client or CDN revalidating an unchanged market gets a
+304 after a single indexed version lookup instead of a full payload.
+"""
+import hashlib
+from typing import Iterable, Optional
+
+from fastapi import Request, Response
+
+from app.config import MARKET_CDN_MAX_AGE
+
+# Responses include the caller's own vote, so caches must key on the API key
+VARY = "X-API-Key"
+
+
+def make_etag(parts: Iterable, viewer_id: Optional[str] = None) -> str:
+    h = hashlib.sha1()
+    for part in parts:
+        h.update(f"{part}\x1f".encode())
+    h.update((viewer_id or "").encode())
+    return f'"{h.hexdigest()[:20]}"'
+
+
+def cache_headers(etag: str, viewer_id: Optional[str]) -> dict:
+    if viewer_id:
+        cache_control = "private, no-cache"
+    else:
+        # Browsers always revalidate (cheap 304); shared caches may serve for a few seconds
+        cache_control = f"public, max-age=0, s-maxage={MARKET_CDN_MAX_AGE}"
+    return {"ETag": etag, "Cache-Control": cache_control, "Vary": VARY}
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so ignore W/ prefixes
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return etag in tags
+
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
@@ -0,0 +1,116 @@
+"""
+Materialized prediction leaderboard.
+
+Rows in the ``leaderboard`` table are bumped once per vote when a market
+resolves, so the leaderboard endpoint is an indexed top-N read instead of
+an aggregate over every resolved vote.
+
+Backfill or repair with:  python -m app.leaderboard rebuild
+"""
+import sys
+from collections import defaultdict
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import case, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from app.database import dialect_insert
+from app.models import LeaderboardEntry, Market, MarketVote, MarketStatus
+
+PERIODS = ("all", "week", "month")
+
+
+def period_key(period: str, when: Optional[datetime] = None) -> str:
+    """Bucket key for a window: "all", "week:2026-W07" or "month:2026-02"."""
+    if period == "all":
+        return "all"
+    when = when or datetime.utcnow()
+    if period == "week":
+        year, week, _ = when.isocalendar()
+        return f"week:{year}-W{week:02d}"
+    return f"month:{when:%Y-%m}"
+
+
+def _windows(category: Optional[str], when: datetime) -> List[Tuple[str, str]]:
+    categories = [""] + ([category] if category else [])
+    return [(period_key(p, when), c) for p in PERIODS for c in categories]
+
+
+def record_resolution(db: Session, market: Market) -> None:
+    """
+    Add a just-resolved market's votes to every leaderboard window it falls in.
+    Call once per market, after claiming the resolution (see resolve_market).
+    Runs in the caller's transaction; the caller commits.
+    """
+    correct = case((MarketVote.outcome_id == market.winning_outcome_id, 1), else_=0)
+    table = LeaderboardEntry.__table__
+    for period, category in _windows(market.category, market.resolved_at):
+        rows = select(
+            literal(period), literal(category), MarketVote.agent_id, literal(1), correct,
+        ).where(MarketVote.market_id == market.id)
+        stmt = dialect_insert(db, table).from_select(
+            ["period", "category", "agent_id", "total_votes", "correct_predictions"], rows,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["period", "category", "agent_id"],
+            set_={
+                "total_votes": table.c.total_votes + stmt.excluded.total_votes,
+                "correct_predictions": table.c.correct_predictions + stmt.excluded.correct_predictions,
+            },
+        )
+        db.execute(stmt)
+
+
+def rebuild(db: Session, batch_size: int = 5000) -> int:
+    """Recompute every leaderboard window from resolved votes. Returns rows written."""
+    counts = defaultdict(lambda: [0, 0])
+    rows = (
+        db.query(
+            MarketVote.agent_id,
+            MarketVote.outcome_id == Market.winning_outcome_id,
+            Market.category,
+            func.coalesce(Market.resolved_at, Market.resolution_date),
+        )
+        .join(Market, Market.id == MarketVote.market_id)
+        .filter(Market.status == MarketStatus.RESOLVED)
+        .yield_per(batch_size)
+    )
+    for agent_id, is_correct, category, resolved_at in rows:
+        for period, cat in _windows(category, resolved_at):
+            entry = counts[(period, cat, agent_id)]
+            entry[0] += 1
+            entry[1] += 1 if is_correct else 0
+
+    db.query(LeaderboardEntry).delete()
+    batch = []
+    for (period, category, agent_id), (total, correct) in counts.items():
+        batch.append({
+            "period": period,
+            "category": category,
+            "agent_id": agent_id,
+            "total_votes": total,
+            "correct_predictions": correct,
+        })
+        if len(batch) >= batch_size:
+            db.execute(insert(LeaderboardEntry), batch)
+            batch = []
+    if batch:
+        db.execute(insert(LeaderboardEntry), batch)
+    db.commit()
+    return len(counts)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        print("Usage: python -m app.leaderboard rebuild")
+        sys.exit(1)
+    from app import migrations
+    from app.database import SessionLocal, engine
+    migrations.upgrade(engine)
+    session = SessionLocal()
+    try:
+        written = rebuild(session)
+        print(f"Leaderboard rebuilt: {written} rows")
+    finally:
+        session.close()
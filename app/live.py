@@ -0,0 +1,70 @@
+"""
+In-process pub/sub for live market odds, feeding the SSE stream endpoints.
+
+Vote, close and resolve handlers publish a market's new odds after they
+commit; each stream subscriber keeps only the latest odds per market, so a
+slow client skips intermediate updates instead of queueing them. Only
+votes handled by this process are seen: with several workers, a stream
+hears about the votes that land on its own worker.
+"""
+import asyncio
+import json
+from typing import Any, Dict, Iterable, Optional, Set
+
+
+class Subscription:
+    def __init__(self, market_ids: Iterable[str]):
+        self.market_ids = set(market_ids)
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._ready = asyncio.Event()
+
+    def push(self, market_id: str, odds: Dict[str, Any]) -> None:
+        self._pending[market_id] = odds
+        self._ready.set()
+
+    async def next(self, timeout: float) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Latest odds per market since the last call, or None if nothing arrived within ``timeout``."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._ready.clear()
+        pending, self._pending = self._pending, {}
+        return pending
+
+
+class MarketBroker:
+    def __init__(self):
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+
+    def has_subscribers(self, market_id: str) -> bool:
+        return market_id in self._subscribers
+
+    def subscribe(self, market_ids: Iterable[str]) -> Subscription:
+        sub = Subscription(market_ids)
+        for market_id in sub.market_ids:
+            self._subscribers.setdefault(market_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        for market_id in sub.market_ids:
+            subs = self._subscribers.get(market_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[market_id]
+
+    def publish(self, market_id: str, odds: Dict[str, Any]) -> None:
+        for sub in self._subscribers.get(market_id, ()):
+            sub.push(market_id, odds)
+
+    @property
+    def connections(self) -> int:
+        return len({sub for subs in self._subscribers.values() for sub in subs})
+
+
+broker = MarketBroker()
+
+
+def sse_event(odds: Dict[str, Any]) -> str:
+    return f"event: odds\nid: {odds['version']}\ndata: {json.dumps(odds, default=str)}\n\n"
@@ -1,18 +1,39 @@
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
 import os
+import asyncio
+import hashlib
 import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request, Depends, HTTPException
+from fastapi import FastAPI, Request, Depends, HTTPException, Header
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import HTMLResponse, JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import select, text
+from sqlalchemy.exc import SQLAlchemyError
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from app.database import engine, Base, get_db
+from app.database import engine, async_engine, write_engine, get_db, get_async_db
 from app.routers import agents, moltbook, markets
+from app import migrations, moltbook_client
+from app.cache import TTLCache
+from app.compression import CompressionMiddleware
+from app.metrics import MetricsMiddleware, metrics_response, query_observer, register_state_collector
+from app.query_stats import QueryDebugMiddleware, instrument_engine
+from app.http_cache import cache_headers, is_not_modified, make_etag, not_modified
+from app.models import Market
+from app.config import (
+    CROSSPOST_WORKER_IN_PROCESS, CSB_MOLTBOOK_API_KEY, EMBED_CACHE_SIZE, EMBED_CACHE_TTL,
+    COMPRESSION_MIN_SIZE, METRICS_ENABLED, METRICS_TOKEN, QUERY_DEBUG, MIGRATE_ON_STARTUP,
+)
+from app.crosspost import run_outbox_worker
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("clawstreetbets")
@@ -48,33 +69,60 @@ def _auto_seed():
         logger.error(f"Auto-seed error: {e}")
 
 
+def _check_schema():
+    """
+    Compare the recorded schema version with the code's. Behind, apply the
+    pending migrations unless MIGRATE_ON_STARTUP is off, in which case refuse
+    to start; migrations should then be run before the rollout.
+    """
+    version = migrations.current_version(engine)
+    if version > migrations.SCHEMA_VERSION:
+        logger.warning(f"Database schema version {version} is newer than this build ({migrations.SCHEMA_VERSION})")
+    if version >= migrations.SCHEMA_VERSION:
+        return
+    if not MIGRATE_ON_STARTUP:
+        raise RuntimeError(
+            f"Database schema is at version {version}, this build needs {migrations.SCHEMA_VERSION}. "
+            "Run: python -m app.migrations upgrade"
+        )
+    logger.warning(f"Applying schema migrations {version + 1}..{migrations.SCHEMA_VERSION} at startup")
+    migrations.upgrade(engine)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    logger.info("Starting ClawStreetBets...")
+    started = time.perf_counter()
+    timings = {}
     try:
-        Base.metadata.create_all(bind=engine)
-        logger.info("Database tables created/verified")
-    except Exception as e:
-        logger.error(f"Failed to create tables: {e}")
-    try:
-        with engine.connect() as conn:
-            dialect = conn.dialect.name
-            if dialect == "postgresql":
-                new_market_statuses = ["open", "closed", "resolved"]
-                for val in new_market_statuses:
-                    try:
-                        conn.execute(text(f"ALTER TYPE marketstatus ADD VALUE IF NOT EXISTS '{val}'"))
-                    except Exception:
-                        pass
-                conn.commit()
-                logger.info("PostgreSQL enum migration complete")
-    except Exception as e:
-        logger.warning(f"Enum migration skipped: {e}")
+        _check_schema()
+    except SQLAlchemyError as e:
+        logger.error(f"Schema check failed: {e}")
+    timings["schema"] = time.perf_counter() - started
 
-    _auto_seed()
-    logger.info("ClawStreetBets startup complete")
+    # Seeding an empty database can take a while; serve traffic meanwhile
+    seeding = asyncio.create_task(asyncio.to_thread(_auto_seed))
+    phase_started = time.perf_counter()
+    await moltbook_client.open_http_client()
+    timings["moltbook client"] = time.perf_counter() - phase_started
+    outbox_worker = None
+    if CROSSPOST_WORKER_IN_PROCESS and CSB_MOLTBOOK_API_KEY:
+        outbox_worker = asyncio.create_task(run_outbox_worker())
+        logger.info("Crosspost outbox worker running in-process")
+    logger.info(
+        f"ClawStreetBets startup complete in {(time.perf_counter() - started) * 1000:.0f}ms "
+        f"(imports {IMPORT_SECONDS * 1000:.0f}ms; "
+        + ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in timings.items()) + ")"
+    )
     yield
+    tasks = [t for t in (seeding, outbox_worker) if t]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await moltbook_client.close_http_client()
+    await async_engine.dispose()
     engine.dispose()
+    if write_engine is not None:
+        write_engine.dispose()
 
 
 limiter = Limiter(key_func=get_remote_address)
@@ -89,33 +137,82 @@ app = FastAPI(
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+
+@app.exception_handler(moltbook_client.MoltbookUnavailable)
+async def moltbook_unavailable_handler(request: Request, exc: moltbook_client.MoltbookUnavailable):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": exc.message},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+_SECURITY_HEADERS = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+    (b"content-security-policy", (
+        b"default-src 'self'; "
+        b"script-src 'self' 'unsafe-inline'; "
+        b"style-src 'self' 'unsafe-inline'; "
+        b"img-src 'self' data: https:; "
+        b"connect-src 'self'"
+    )),
+]
+_SECURITY_HEADER_NAMES = {name for name, _ in _SECURITY_HEADERS}
+
+
+class SecurityHeadersMiddleware:
+    """
+    Raw ASGI middleware appending precomputed security headers on
+    http.response.start. Unlike BaseHTTPMiddleware it adds no task or body
+    stream per request, so streaming responses pass straight through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = [h for h in message.get("headers", []) if h[0].lower() not in _SECURITY_HEADER_NAMES]
+                message["headers"] = headers + _SECURITY_HEADERS
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+# Middleware added last runs outermost. Order from the outside in:
+#   Metrics -> QueryDebug -> SecurityHeaders -> CORS -> Compression -> routes
+# so CORS preflight and error responses get security headers too,
+# compression sees each route's response as a single body, and request
+# latency covers the whole stack.
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=CORS_ORIGINS,
     allow_methods=["GET", "POST", "PATCH", "DELETE"],
-    allow_headers=["Content-Type", "X-API-Key", "X-Admin-Key"],
+    allow_headers=["Content-Type", "X-API-Key", "X-Admin-Key", "If-None-Match"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
-
-
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request, call_next):
-        response = await call_next(request)
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        response.headers["Content-Security-Policy"] = (
-            "default-src 'self'; "
-            "script-src 'self' 'unsafe-inline'; "
-            "style-src 'self' 'unsafe-inline'; "
-            "img-src 'self' data: https:; "
-            "connect-src 'self'"
-        )
-        return response
-
-
 app.add_middleware(SecurityHeadersMiddleware)
+if QUERY_DEBUG:
+    app.add_middleware(QueryDebugMiddleware)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+_engines = {"sync": engine, "async": async_engine.sync_engine}
+if write_engine is not None:
+    _engines["writer"] = write_engine
+if METRICS_ENABLED:
+    register_state_collector(_engines)
+for _name, _engine in _engines.items():
+    instrument_engine(_engine, query_observer(_name) if METRICS_ENABLED else None)
 
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 templates = Jinja2Templates(directory="app/templates")
@@ -134,11 +231,20 @@ def health_check():
 def readiness_check(db: Session = Depends(get_db)):
     try:
         db.execute(text("SELECT 1"))
-        return {"status": "ready", "database": "ok"}
+        return {"status": "ready", "database": "ok", "moltbook": moltbook_client.breaker.to_dict()}
     except Exception:
         raise HTTPException(status_code=503, detail="Database not available")
 
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics(authorization: str = Header(None)):
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return metrics_response()
+
+
 @app.get("/")
 async def home(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
@@ -154,10 +260,42 @@ async def markets_page(request: Request):
     return templates.TemplateResponse("markets.html", {"request": request})
 
 
-@app.get("/markets/{market_id}/embed")
-async def market_embed(request: Request, market_id: str):
-    return templates.TemplateResponse("market_embed.html", {
-        "request": request,
+# (template hash, market_id, version) -> rendered embed HTML
+embed_cache = TTLCache(maxsize=EMBED_CACHE_SIZE, ttl=EMBED_CACHE_TTL)
+# Part of the embed ETag and cache key, so a deploy that changes the widget
+# invalidates browser, CDN and in-process copies without a market update
+with open("app/templates/market_embed.html", "rb") as _template:
+    EMBED_TEMPLATE_HASH = hashlib.sha1(_template.read()).hexdigest()[:12]
+
+
+def _render_embed(market_id: str, market) -> str:
+    return templates.get_template("market_embed.html").render({
         "market_id": market_id,
-        "title": "ClawStreetBets",
+        "market": jsonable_encoder(market),
+        "title": market["title"] if market else "ClawStreetBets",
     })
+
+
+@app.get("/markets/{market_id}/embed")
+async def market_embed(request: Request, market_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Widget with the market inlined, so it paints without a second request."""
+    version = await db.scalar(select(Market.version).where(Market.id == market_id))
+    if version is None:
+        return HTMLResponse(_render_embed(market_id, None), status_code=404)
+
+    headers = cache_headers(make_etag(("embed", EMBED_TEMPLATE_HASH, market_id, version)), None)
+    if is_not_modified(request, headers["ETag"]):
+        return not_modified(headers)
+    key = (EMBED_TEMPLATE_HASH, market_id, version)
+    html = embed_cache.get(key)
+    if html is None:
+        snapshot = await markets.load_market_responses(select(Market).where(Market.id == market_id), None, db)
+        if not snapshot:
+            return HTMLResponse(_render_embed(market_id, None), status_code=404)
+        html = _render_embed(market_id, snapshot[0])
+        embed_cache.set(key, html)
+    return HTMLResponse(html, headers=headers)
+
+
+# Time spent importing this module and everything it pulls in
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
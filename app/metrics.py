@@ -0,0 +1,160 @@
+"""
+Prometheus metrics, served at /metrics.
+
+Request metrics are labelled by route template (``/api/markets/{market_id}``),
+never the raw path, so series stay bounded. Per-request DB stats come
+from app.query_stats. Pool, breaker and queue gauges are read only when scraped.
+"""
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from starlette.responses import Response
+
+from app.query_stats import track_queries
+
+HTTP_REQUESTS = Counter(
+    "csb_http_requests_total", "HTTP requests by route and status", ["method", "route", "status"],
+)
+HTTP_LATENCY = Histogram(
+    "csb_http_request_duration_seconds", "HTTP request latency", ["method", "route"],
+)
+DB_QUERIES = Counter("csb_db_queries_total", "SQL statements executed", ["engine"])
+DB_SECONDS = Counter("csb_db_query_seconds_total", "Time spent executing SQL statements", ["engine"])
+REQUEST_QUERIES = Histogram(
+    "csb_db_queries_per_request", "SQL statements per HTTP request", ["route"],
+    buckets=(0, 1, 2, 3, 4, 6, 8, 12, 20, 50),
+)
+REQUEST_DB_SECONDS = Histogram(
+    "csb_db_seconds_per_request", "Time spent in SQL per HTTP request", ["route"],
+)
+MOLTBOOK_LATENCY = Histogram(
+    "csb_moltbook_request_duration_seconds", "Moltbook API call latency", ["method", "endpoint"],
+)
+MOLTBOOK_ERRORS = Counter(
+    "csb_moltbook_errors_total", "Failed Moltbook API calls",
+    ["kind"],  # unreachable, server_error, client_error, breaker_open, budget_exhausted
+)
+
+
+def query_observer(engine_name: str):
+    """Callback for query_stats.instrument_engine feeding the per-engine SQL counters."""
+    queries = DB_QUERIES.labels(engine_name)
+    seconds = DB_SECONDS.labels(engine_name)
+
+    def observe(elapsed: float) -> None:
+        queries.inc()
+        seconds.inc(elapsed)
+
+    return observe
+
+
+def observe_moltbook(method: str, path: str, seconds: float) -> None:
+    # First path segment ("agents", "posts", ...) keeps ids out of the labels
+    MOLTBOOK_LATENCY.labels(method, path.split("/", 2)[1]).observe(seconds)
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if scope["path"].startswith("/static/"):
+        return "/static"
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Raw ASGI middleware recording latency, status and DB use per route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        with track_queries() as stats:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                elapsed = time.perf_counter() - start
+                route = _route_label(scope)
+                method = scope["method"]
+                HTTP_REQUESTS.labels(method, route, str(status)).inc()
+                HTTP_LATENCY.labels(method, route).observe(elapsed)
+                REQUEST_QUERIES.labels(route).observe(stats.queries)
+                REQUEST_DB_SECONDS.labels(route).observe(stats.db_seconds)
+
+
+class StateCollector:
+    """Gauges read at scrape time: connection pools, Moltbook breaker, queues and streams."""
+
+    def __init__(self, engines):
+        self.engines = engines
+
+    def collect(self):
+        from app import moltbook_client
+        from app.crosspost import crosspost_all_job
+        from app.live import broker
+
+        checked_out = GaugeMetricFamily("csb_db_pool_checked_out", "Connections in use", labels=["engine"])
+        overflow = GaugeMetricFamily("csb_db_pool_overflow", "Connections beyond pool_size", labels=["engine"])
+        size = GaugeMetricFamily("csb_db_pool_size", "Configured pool size", labels=["engine"])
+        for name, engine in self.engines.items():
+            pool = engine.pool
+            if hasattr(pool, "checkedout"):
+                checked_out.add_metric([name], pool.checkedout())
+                overflow.add_metric([name], max(pool.overflow(), 0))
+                size.add_metric([name], pool.size())
+        yield checked_out
+        yield overflow
+        yield size
+
+        breaker = GaugeMetricFamily("csb_moltbook_breaker_state", "1 for the breaker's current state", labels=["state"])
+        for state in ("closed", "half_open", "open"):
+            breaker.add_metric([state], 1 if moltbook_client.breaker.state == state else 0)
+        yield breaker
+
+        yield GaugeMetricFamily("csb_sse_connections", "Open market odds streams", value=broker.connections)
+        yield GaugeMetricFamily(
+            "csb_crosspost_all_running", "1 while the admin crosspost-all job runs",
+            value=1 if crosspost_all_job.running else 0,
+        )
+        yield from self._outbox()
+
+    def _outbox(self):
+        from sqlalchemy import func, select
+        from app.database import engine
+        from app.models import CrosspostOutbox
+
+        depth = GaugeMetricFamily("csb_crosspost_outbox_depth", "Crosspost outbox rows", labels=["state"])
+        try:
+            with engine.connect() as conn:
+                rows = conn.execute(
+                    select(CrosspostOutbox.gave_up_at.is_(None), func.count())
+                    .group_by(CrosspostOutbox.gave_up_at.is_(None))
+                ).all()
+        except Exception:
+            return
+        counts = {bool(pending): n for pending, n in rows}
+        depth.add_metric(["pending"], counts.get(True, 0))
+        depth.add_metric(["gave_up"], counts.get(False, 0))
+        yield depth
+
+
+def register_state_collector(engines) -> None:
+    REGISTRY.register(StateCollector(engines))
+
+
+def metrics_response() -> Response:
+    return Response(generate_latest(REGISTRY), headers={"Content-Type": CONTENT_TYPE_LATEST})
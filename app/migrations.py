@@ -0,0 +1,159 @@
+"""
+Versioned schema migrations.
+
+Each migration runs once, in order, in its own transaction, and is recorded
+in ``schema_version``. Apply them before a rollout (the Procfile ``release``
+entry, or Railway's pre-deploy command):
+
+    python -m app.migrations upgrade
+    python -m app.migrations status
+
+At boot the app only reads the recorded version, so a replica starting
+against an up-to-date database runs no DDL. Add a new migration by
+appending to MIGRATIONS; never edit one that has shipped.
+"""
+import logging
+import sys
+import time
+from typing import Callable, List, Tuple
+
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError, OperationalError, ProgrammingError
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models import AgentStats, LeaderboardEntry, SchemaVersion
+
+logger = logging.getLogger("clawstreetbets.migrations")
+
+# Arbitrary key for the Postgres advisory lock serializing concurrent upgrades
+_LOCK_ID = 7_240_113
+
+
+def _baseline(conn: Connection) -> None:
+    """
+    Bring a database of any earlier shape to the current schema: create
+    missing tables, add columns introduced later (nullable, or NOT NULL with
+    a server default) and missing indexes, and the legacy lowercase
+    marketstatus labels on Postgres. Empty agent_stats and leaderboard
+    tables are backfilled from existing markets and votes.
+    """
+    Base.metadata.create_all(bind=conn)
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            col_type = column.type.compile(dialect=conn.dialect)
+            if column.nullable:
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"
+            elif column.server_default is not None:
+                default = column.server_default.arg
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type} NOT NULL DEFAULT {default}"
+            else:
+                continue
+            conn.execute(text(ddl))
+            logger.info(f"Added column {table.name}.{column.name}")
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+    if conn.dialect.name == "postgresql":
+        _add_legacy_status_labels(conn)
+    _backfill_rollups(conn)
+
+
+def _add_legacy_status_labels(conn: Connection) -> None:
+    # Before PostgreSQL 12, ALTER TYPE ... ADD VALUE can't run inside a
+    # transaction block. Try it under a savepoint so a failure can't abort
+    # the baseline, then fall back to a separate autocommit connection.
+    present = set(conn.scalars(text(
+        "SELECT e.enumlabel FROM pg_enum e JOIN pg_type t ON t.oid = e.enumtypid WHERE t.typname = 'marketstatus'"
+    )))
+    for val in ("open", "closed", "resolved"):
+        if val in present:
+            continue
+        ddl = text(f"ALTER TYPE marketstatus ADD VALUE IF NOT EXISTS '{val}'")
+        try:
+            with conn.begin_nested():
+                conn.execute(ddl)
+            continue
+        except DBAPIError:
+            pass
+        try:
+            with conn.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as autocommit:
+                autocommit.execute(ddl)
+        except DBAPIError as e:
+            logger.warning(f"Could not add marketstatus label '{val}': {e}")
+
+
+def _backfill_rollups(conn: Connection) -> None:
+    # The rollups are only maintained incrementally, so tables created for a
+    # database that already has votes would otherwise start at zero
+    from app import agent_stats, leaderboard
+
+    session = Session(bind=conn)  # joins the migration's transaction
+    try:
+        for name, model, rebuild in (
+            ("agent_stats", AgentStats, agent_stats.rebuild),
+            ("leaderboard", LeaderboardEntry, leaderboard.rebuild),
+        ):
+            if session.scalar(select(func.count()).select_from(model)):
+                continue
+            written = rebuild(session)
+            if written:
+                logger.info(f"Backfilled {name}: {written} rows")
+    finally:
+        session.close()
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "baseline schema", _baseline),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(engine: Engine) -> int:
+    """Highest applied migration, or 0 for a database that predates versioning."""
+    try:
+        with engine.connect() as conn:
+            return conn.scalar(select(func.max(SchemaVersion.version))) or 0
+    except (OperationalError, ProgrammingError):
+        return 0  # no schema_version table yet
+
+
+def upgrade(engine: Engine) -> List[int]:
+    """Apply pending migrations in order. Returns the versions applied."""
+    applied = []
+    for version, description, migrate in MIGRATIONS:
+        with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                # Replicas booting together take turns; the loser sees the work done
+                conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _LOCK_ID})
+            SchemaVersion.__table__.create(bind=conn, checkfirst=True)
+            done = conn.scalar(select(SchemaVersion.version).where(SchemaVersion.version == version))
+            if done is not None:
+                continue
+            started = time.perf_counter()
+            migrate(conn)
+            conn.execute(SchemaVersion.__table__.insert().values(version=version, description=description))
+            logger.info(f"Applied migration {version} ({description}) in {time.perf_counter() - started:.2f}s")
+            applied.append(version)
+    return applied
+
+
+if __name__ == "__main__":
+    command = sys.argv[1:]
+    if command not in (["upgrade"], ["status"]):
+        print("Usage: python -m app.migrations upgrade|status")
+        sys.exit(1)
+    logging.basicConfig(level=logging.INFO)
+    from app.database import engine
+    if command == ["status"]:
+        version = current_version(engine)
+        print(f"Schema version {version}, latest {SCHEMA_VERSION}"
+              + ("" if version >= SCHEMA_VERSION else f" ({SCHEMA_VERSION - version} pending)"))
+    else:
+        applied = upgrade(engine)
+        print(f"Applied migrations: {', '.join(map(str, applied))}" if applied else "Schema is up to date")
@@ -41,6 +41,10 @@ class Agent(Base):
     moltbook_karma = Column(Integer, default=0)
     moltbook_last_synced = Column(DateTime, nullable=True, default=None)
 
+    __table_args__ = (
+        Index("ix_agents_active_created_at", "is_active", "created_at", "id"),
+    )
+
 
 class Market(Base):
     __tablename__ = "markets"
@@ -55,6 +59,10 @@ class Market(Base):
     winning_outcome_id = Column(String, ForeignKey("market_outcomes.id", use_alter=True), nullable=True)
     vote_count = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
+    resolved_at = Column(DateTime, nullable=True, default=None)
+    crossposted_at = Column(DateTime, nullable=True, default=None)
+    # Bumped on every vote, close and resolve; drives market ETags
+    version = Column(Integer, nullable=False, default=0, server_default="0")
 
     agent = relationship("Agent", foreign_keys=[agent_id])
     outcomes = relationship("MarketOutcome", back_populates="market", foreign_keys="MarketOutcome.market_id", cascade="all, delete-orphan")
@@ -64,6 +72,8 @@ class Market(Base):
         Index("ix_markets_agent_id", "agent_id"),
         Index("ix_markets_status", "status"),
         Index("ix_markets_created_at", "created_at"),
+        Index("ix_markets_vote_count_id", "vote_count", "id"),
+        Index("ix_markets_status_resolution_date", "status", "resolution_date", "id"),
     )
 
 
@@ -98,3 +108,68 @@ class MarketVote(Base):
         Index("ix_market_votes_market_id", "market_id"),
         Index("ix_market_votes_agent_id", "agent_id"),
     )
+
+
+class AgentStats(Base):
+    """Per-agent counters kept in step with markets and votes by app.agent_stats."""
+    __tablename__ = "agent_stats"
+
+    agent_id = Column(String, ForeignKey("agents.id"), primary_key=True)
+    markets_created = Column(Integer, default=0, nullable=False)
+    votes_cast = Column(Integer, default=0, nullable=False)
+    total_votes = Column(Integer, default=0, nullable=False)
+    correct_predictions = Column(Integer, default=0, nullable=False)
+
+
+class LeaderboardEntry(Base):
+    """
+    Per-agent prediction totals on resolved markets, maintained by
+    app.leaderboard when a market resolves. One row per agent per window:
+    period is "all", "week:YYYY-Www" or "month:YYYY-MM" and category is ""
+    for all categories.
+    """
+    __tablename__ = "leaderboard"
+
+    period = Column(String(20), primary_key=True)
+    category = Column(String(50), primary_key=True, default="")
+    agent_id = Column(String, ForeignKey("agents.id"), primary_key=True)
+    total_votes = Column(Integer, default=0, nullable=False)
+    correct_predictions = Column(Integer, default=0, nullable=False)
+
+    agent = relationship("Agent", foreign_keys=[agent_id])
+
+    __table_args__ = (
+        Index("ix_leaderboard_rank", "period", "category", "correct_predictions", "total_votes"),
+    )
+
+
+class CrosspostOutbox(Base):
+    """
+    Pending Moltbook crosspost for a market, written in the same transaction
+    as the market and drained by the app.crosspost worker. Rows are deleted
+    once delivered; gave_up_at is set after the last retry fails.
+    """
+    __tablename__ = "crosspost_outbox"
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    market_id = Column(String, ForeignKey("markets.id"), nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error = Column(Text, nullable=True)
+    gave_up_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    market = relationship("Market", foreign_keys=[market_id])
+
+    __table_args__ = (
+        Index("ix_crosspost_outbox_due", "gave_up_at", "next_attempt_at"),
+    )
+
+
+class SchemaVersion(Base):
+    """One row per migration applied by app.migrations; the highest version is current."""
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    description = Column(String(200), nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow, nullable=False)
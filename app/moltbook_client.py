@@ -1,14 +1,25 @@
 """
 Moltbook API client for ClawStreetBets integration.
 All HTTP calls to www.moltbook.com are centralized here.
-Includes retry logic for unreliable endpoints.
+Includes retry logic for unreliable endpoints, a process-wide circuit
+breaker and an optional per-request deadline budget.
 """
 import asyncio
+import importlib.util
 import logging
+import math
+import time
 from typing import Optional, Dict, Any, List
 
 import httpx
 
+from app import metrics
+from app.config import (
+    MOLTBOOK_MAX_CONNECTIONS, MOLTBOOK_MAX_KEEPALIVE,
+    MOLTBOOK_KEEPALIVE_EXPIRY, MOLTBOOK_HTTP2,
+    MOLTBOOK_BREAKER_FAILURES, MOLTBOOK_BREAKER_RESET,
+)
+
 logger = logging.getLogger("clawstreetbets.moltbook")
 
 MOLTBOOK_BASE_URL = "https://www.moltbook.com/api/v1"
@@ -25,6 +36,41 @@ CATEGORY_SUBMOLTS: Dict[str, List[str]] = {
 }
 
 
+# One pooled client per process so calls reuse keep-alive TCP/TLS connections.
+# Opened and closed by the app lifespan; created lazily for scripts.
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _new_http_client() -> httpx.AsyncClient:
+    http2 = MOLTBOOK_HTTP2 and importlib.util.find_spec("h2") is not None
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=MOLTBOOK_MAX_CONNECTIONS,
+            max_keepalive_connections=MOLTBOOK_MAX_KEEPALIVE,
+            keepalive_expiry=MOLTBOOK_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = _new_http_client()
+    return _http_client
+
+
+async def open_http_client() -> None:
+    get_http_client()
+
+
+async def close_http_client() -> None:
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
 class MoltbookError(Exception):
     def __init__(self, message: str, status_code: Optional[int] = None,
                  hint: Optional[str] = None):
@@ -34,17 +80,103 @@ class MoltbookError(Exception):
         super().__init__(message)
 
 
+class MoltbookUnavailable(MoltbookError):
+    """Moltbook is down, the breaker is open, or the caller's budget ran out."""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message, status_code=503)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through and consecutive failures are counted.
+    Open: calls fail immediately until ``reset_timeout`` has passed.
+    Half-open: one probe call is let through; success closes the breaker,
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+
+    def retry_after(self) -> int:
+        if self.state != "open":
+            return 1
+        return max(1, math.ceil(self.opened_at + self.reset_timeout - time.monotonic()))
+
+    def allow(self) -> bool:
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+            self._probing = False
+        if self.state == "half_open":
+            # A probe that never reported back (e.g. cancelled) stops blocking after reset_timeout
+            now = time.monotonic()
+            if self._probing and now - self._probe_started < self.reset_timeout:
+                return False
+            self._probing = True
+            self._probe_started = now
+        return True
+
+    def record_success(self) -> None:
+        if self.state != "closed":
+            logger.info("Moltbook circuit breaker closed")
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"Moltbook circuit breaker opened after {self.failures} failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "retry_after": self.retry_after() if self.state == "open" else None,
+        }
+
+
+# Shared by every MoltbookClient in the process
+breaker = CircuitBreaker(MOLTBOOK_BREAKER_FAILURES, MOLTBOOK_BREAKER_RESET)
+
+
 class MoltbookClient:
-    """Async HTTP client for Moltbook API v1 with retry support."""
+    """
+    Async HTTP client for Moltbook API v1 with retry support, sharing the
+    process-wide connection pool and circuit breaker.
 
-    def __init__(self, api_key: str, timeout: float = 30.0):
+    ``budget`` caps the total seconds spent across every call made through
+    this client, retries and backoff included; request handlers create one
+    client per request so the whole request stays inside its budget.
+    """
+
+    def __init__(self, api_key: str, timeout: float = 30.0, budget: Optional[float] = None):
         self.api_key = api_key
         self.timeout = timeout
+        self.deadline = time.monotonic() + budget if budget is not None else None
         self.headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json",
         }
 
+    def _remaining(self) -> float:
+        if self.deadline is None:
+            return self.timeout
+        return min(self.timeout, self.deadline - time.monotonic())
+
     async def _request(
         self,
         method: str,
@@ -58,35 +190,57 @@ class MoltbookClient:
         last_error = None
 
         for attempt in range(retries):
+            timeout = self._remaining()
+            if timeout <= 0:
+                metrics.MOLTBOOK_ERRORS.labels("budget_exhausted").inc()
+                raise MoltbookUnavailable("Moltbook request budget exhausted", retry_after=breaker.retry_after())
+            if not breaker.allow():
+                metrics.MOLTBOOK_ERRORS.labels("breaker_open").inc()
+                raise MoltbookUnavailable("Moltbook is unavailable", retry_after=breaker.retry_after())
+            started = time.perf_counter()
             try:
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    resp = await client.request(
-                        method, url,
-                        headers=self.headers,
-                        json=json_body,
-                        params=params,
+                resp = await get_http_client().request(
+                    method, url,
+                    headers=self.headers,
+                    json=json_body,
+                    params=params,
+                    timeout=timeout,
+                )
+                metrics.observe_moltbook(method, path, time.perf_counter() - started)
+                if resp.status_code >= 500:
+                    metrics.MOLTBOOK_ERRORS.labels("server_error").inc()
+                    breaker.record_failure()
+                    raise MoltbookUnavailable(
+                        message=f"Moltbook error (HTTP {resp.status_code})",
+                        retry_after=breaker.retry_after(),
+                    )
+                breaker.record_success()
+                try:
+                    data = resp.json()
+                except (ValueError, UnicodeDecodeError):
+                    raise MoltbookError(
+                        message=f"Moltbook returned invalid JSON (HTTP {resp.status_code})",
+                        status_code=resp.status_code,
+                    )
+                if resp.status_code >= 400:
+                    metrics.MOLTBOOK_ERRORS.labels("client_error").inc()
+                    raise MoltbookError(
+                        message=data.get("error", f"HTTP {resp.status_code}"),
+                        status_code=resp.status_code,
+                        hint=data.get("hint"),
                     )
-                    try:
-                        data = resp.json()
-                    except (ValueError, UnicodeDecodeError):
-                        raise MoltbookError(
-                            message=f"Moltbook returned invalid JSON (HTTP {resp.status_code})",
-                            status_code=resp.status_code,
-                        )
-                    if resp.status_code >= 400:
-                        raise MoltbookError(
-                            message=data.get("error", f"HTTP {resp.status_code}"),
-                            status_code=resp.status_code,
-                            hint=data.get("hint"),
-                        )
-                    return data.get("data", data)
+                return data.get("data", data)
             except httpx.RequestError as e:
-                last_error = MoltbookError(
+                metrics.MOLTBOOK_ERRORS.labels("unreachable").inc()
+                breaker.record_failure()
+                last_error = MoltbookUnavailable(
                     message=f"Moltbook unreachable: {str(e)}",
-                    status_code=None,
+                    retry_after=breaker.retry_after(),
                 )
                 if attempt < retries - 1:
                     wait = backoff * (2 ** attempt)
+                    if self.deadline is not None and self._remaining() <= wait:
+                        break
                     logger.warning(f"Moltbook {method} {path} attempt {attempt + 1} failed, retrying in {wait}s: {e}")
                     await asyncio.sleep(wait)
             except MoltbookError:
@@ -172,10 +326,14 @@ class MoltbookClient:
         description: str,
         category: str,
         base_url: str = "https://web-production-18cf56.up.railway.app",
+        max_concurrency: int = 4,
+        deadline: float = 30.0,
     ) -> List[Dict[str, Any]]:
         """
         Cross-post a market to the clawstreetbets submolt and any
-        category-relevant submolts. Returns list of created posts.
+        category-relevant submolts concurrently. Posts still running after
+        ``deadline`` seconds are cancelled. Returns one result per submolt:
+        {"submolt", "ok", "post"} on success or {"submolt", "ok", "error"}.
         """
         outcome_text = " vs ".join(outcomes)
         market_url = f"{base_url}/markets#{market_id}"
@@ -188,21 +346,36 @@ class MoltbookClient:
             f"[Embed widget]({embed_url})"
         )
 
-        results = []
         submolts = ["clawstreetbets"] + CATEGORY_SUBMOLTS.get(category, [])
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def post_to(submolt: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    result = await self.create_post(
+                        submolt=submolt,
+                        title=title,
+                        content=content.strip(),
+                    )
+                    logger.info(f"Cross-posted market {market_id} to m/{submolt}")
+                    return {"submolt": submolt, "ok": True, "post": result}
+                except MoltbookError as e:
+                    logger.warning(f"Failed to cross-post to m/{submolt}: {e.message}")
+                    return {"submolt": submolt, "ok": False, "error": e.message}
+
+        tasks = [asyncio.create_task(post_to(submolt)) for submolt in submolts]
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
 
-        for submolt in submolts:
-            try:
-                result = await self.create_post(
-                    submolt=submolt,
-                    title=title,
-                    content=content.strip(),
-                )
-                results.append(result)
-                logger.info(f"Cross-posted market {market_id} to m/{submolt}")
-            except MoltbookError as e:
-                logger.warning(f"Failed to cross-post to m/{submolt}: {e.message}")
-
+        results = []
+        for submolt, task in zip(submolts, tasks):
+            if task in done:
+                results.append(task.result())
+            else:
+                logger.warning(f"Cross-post of market {market_id} to m/{submolt} exceeded {deadline}s deadline")
+                results.append({"submolt": submolt, "ok": False, "error": "deadline exceeded"})
         return results
 
     async def setup_csb_presence(self) -> Dict[str, Any]:
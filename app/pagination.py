@@ -0,0 +1,52 @@
+"""
+Opaque keyset cursors for listing endpoints.
+
+A cursor encodes the sort order it was issued for plus the (sort value, id)
+of the last row on the page. The next page resumes strictly after that key,
+so every page is an index range scan no matter how deep the caller goes.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+from fastapi import HTTPException
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort: str, value: Any, row_id: str) -> str:
+    if isinstance(value, datetime):
+        value = {"dt": value.isoformat()}
+    raw = json.dumps({"s": sort, "k": [value, row_id]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, value_type: type) -> Tuple[Any, str]:
+    """
+    Return the (sort value, id) key stored in a cursor, or raise 400.
+    ``value_type`` is the sort column's Python type; a crafted cursor with any
+    other value would otherwise reach the database comparison and fail there.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value, row_id = data["k"]
+        if data["s"] != sort or not isinstance(row_id, str):
+            raise ValueError("cursor issued for a different sort")
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["dt"])
+        # bool is an int subclass, but never a valid sort value
+        if not isinstance(value, value_type) or isinstance(value, bool):
+            raise ValueError("cursor value has the wrong type")
+        return value, row_id
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def next_cursor(sort: str, rows: list, limit: int, key_field: str) -> Optional[str]:
+    """Cursor for the page after ``rows`` (fetched with limit + 1), or None on the last page."""
+    if len(rows) <= limit:
+        return None
+    last = rows[limit - 1]
+    return encode_cursor(sort, last[key_field], last["id"])
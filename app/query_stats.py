@@ -0,0 +1,146 @@
+"""
+Per-request SQL statistics and N+1 detection.
+
+Cursor hooks on both engines count statements and time for the current
+request; /metrics reads the totals. With QUERY_DEBUG=1 statements are also
+grouped by SQL text, so one statement run many times with different
+parameters (the shape of an N+1 loop) is logged, and every response carries
+X-DB-Queries, X-DB-Time-Ms and X-DB-Repeated headers.
+
+In tests, ``assert_max_queries`` bounds the queries an endpoint may run:
+
+    with assert_max_queries(3):
+        client.get(f"/api/markets/{market_id}")
+"""
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from app.config import QUERY_REPEAT_THRESHOLD
+
+logger = logging.getLogger("clawstreetbets.queries")
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds", "statements")
+
+    def __init__(self, track_statements: bool = False):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements: Optional[Counter] = Counter() if track_statements else None
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.queries += 1
+        self.db_seconds += seconds
+        if self.statements is not None:
+            self.statements[statement] += 1
+
+    def repeated(self, threshold: int = QUERY_REPEAT_THRESHOLD) -> List[Tuple[str, int]]:
+        """Statements run at least ``threshold`` times, most repeated first."""
+        if not self.statements:
+            return []
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+
+# Stats for the current request, shared by the metrics and query debug middleware
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+# Process-wide trackers from assert_max_queries; they see queries from any thread
+_trackers: List[RequestStats] = []
+
+
+def instrument_engine(engine, on_query: Optional[Callable[[float], None]] = None) -> None:
+    """
+    Record every statement run on ``engine`` (a sync Engine or
+    AsyncEngine.sync_engine) against the current request. ``on_query`` is
+    called with each statement's duration.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("csb_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["csb_query_start"].pop()
+        if on_query is not None:
+            on_query(elapsed)
+        stats = request_stats.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+        for tracker in _trackers:
+            tracker.record(statement, elapsed)
+
+
+@contextmanager
+def track_queries(track_statements: bool = False) -> Iterator[RequestStats]:
+    """Stats for the enclosed block, reusing the enclosing request's if there is one."""
+    stats = request_stats.get()
+    if stats is not None:
+        if track_statements and stats.statements is None:
+            stats.statements = Counter()
+        yield stats
+        return
+    stats = RequestStats(track_statements)
+    token = request_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        request_stats.reset(token)
+
+
+def _describe(repeated: List[Tuple[str, int]]) -> str:
+    return "; ".join(f"{n}x {' '.join(sql.split())[:200]}" for sql, n in repeated)
+
+
+@contextmanager
+def assert_max_queries(limit: int, repeat_threshold: int = QUERY_REPEAT_THRESHOLD) -> Iterator[RequestStats]:
+    """Fail if the enclosed block runs more than ``limit`` statements, naming any repeated ones."""
+    stats = RequestStats(track_statements=True)
+    _trackers.append(stats)
+    try:
+        yield stats
+    finally:
+        _trackers.remove(stats)
+    if stats.queries > limit:
+        message = f"{stats.queries} queries, expected at most {limit}"
+        repeated = stats.repeated(repeat_threshold)
+        if repeated:
+            message += f"; repeated: {_describe(repeated)}"
+        raise AssertionError(message)
+
+
+class QueryDebugMiddleware:
+    """Raw ASGI middleware adding query totals to responses and logging likely N+1 patterns."""
+
+    def __init__(self, app, repeat_threshold: int = QUERY_REPEAT_THRESHOLD):
+        self.app = app
+        self.repeat_threshold = repeat_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries(track_statements=True) as stats:
+            async def send_with_stats(message):
+                if message["type"] == "http.response.start":
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-db-queries", str(stats.queries).encode()),
+                        (b"x-db-time-ms", f"{stats.db_seconds * 1000:.1f}".encode()),
+                        (b"x-db-repeated", str(len(stats.repeated(self.repeat_threshold))).encode()),
+                    ]
+                await send(message)
+
+            await self.app(scope, receive, send_with_stats)
+
+            repeated = stats.repeated(self.repeat_threshold)
+            if repeated:
+                logger.warning(
+                    f"Possible N+1 on {scope['method']} {scope['path']} "
+                    f"({stats.queries} queries): {_describe(repeated)}"
+                )
@@ -1,15 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
-from app.database import get_db
-from app.models import Agent, Market, MarketVote, MarketStatus
+from sqlalchemy import select, tuple_
+from typing import List, Optional
+from app.database import get_db, get_async_db
+from app.models import Agent, AgentStats
 from app.schemas import (
     AgentCreate, AgentUpdate, AgentResponse, AgentCreatedResponse,
     MoltbookOnboardRequest, MoltbookOnboardResponse,
 )
-from app.auth import get_current_agent
-from app.moltbook_client import MoltbookClient, MoltbookError
+from app.auth import get_current_agent, forget_api_key
+from app.pagination import NEXT_CURSOR_HEADER, decode_cursor, next_cursor
+from app.moltbook_client import MoltbookClient, MoltbookError, MoltbookUnavailable
+from app.config import MOLTBOOK_REQUEST_BUDGET
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
@@ -26,61 +29,32 @@ def _agent_to_dict(agent: Agent) -> dict:
     return data
 
 
-def _agent_with_stats(agent: Agent, db: Session) -> dict:
-    markets_created = db.query(func.count(Market.id)).filter(
-        Market.agent_id == agent.id
-    ).scalar() or 0
-
-    total_votes = db.query(func.count(MarketVote.id)).filter(
-        MarketVote.agent_id == agent.id,
-    ).join(Market, Market.id == MarketVote.market_id).filter(
-        Market.status == MarketStatus.RESOLVED,
-    ).scalar() or 0
-
-    correct_predictions = db.query(func.count(MarketVote.id)).filter(
-        MarketVote.agent_id == agent.id,
-    ).join(Market, Market.id == MarketVote.market_id).filter(
-        Market.status == MarketStatus.RESOLVED,
-        MarketVote.outcome_id == Market.winning_outcome_id,
-    ).scalar() or 0
-
+def _agent_stats_dict(agent: Agent, stats: Optional[AgentStats]) -> dict:
+    total_votes = stats.total_votes if stats else 0
+    correct_predictions = stats.correct_predictions if stats else 0
     accuracy = round(correct_predictions / total_votes * 100, 1) if total_votes > 0 else 0.0
 
     data = _agent_to_dict(agent)
-    data["markets_created"] = markets_created
+    data["markets_created"] = stats.markets_created if stats else 0
+    data["votes_cast"] = stats.votes_cast if stats else 0
     data["total_votes"] = total_votes
     data["correct_predictions"] = correct_predictions
     data["accuracy"] = accuracy
     return data
 
 
-def _agents_with_stats_batch(agents: list, db: Session) -> list:
-    if not agents:
-        return []
-    agent_ids = [a.id for a in agents]
+async def _agent_with_stats(agent: Agent, db: AsyncSession) -> dict:
+    return _agent_stats_dict(agent, await db.get(AgentStats, agent.id))
 
-    market_counts = dict(
-        db.query(Market.agent_id, func.count(Market.id))
-        .filter(Market.agent_id.in_(agent_ids))
-        .group_by(Market.agent_id)
-        .all()
-    )
 
-    results = []
-    for agent in agents:
-        data = _agent_to_dict(agent)
-        data["markets_created"] = market_counts.get(agent.id, 0)
-        data["total_votes"] = 0
-        data["correct_predictions"] = 0
-        data["accuracy"] = 0.0
-        results.append(data)
-    return results
+def _query_agents_with_stats(db: Session):
+    return db.query(Agent, AgentStats).outerjoin(AgentStats, AgentStats.agent_id == Agent.id)
 
 
 @router.post("", response_model=AgentCreatedResponse, status_code=201)
 @limiter.limit("5/minute")
-async def create_agent(request: Request, payload: AgentCreate, db: Session = Depends(get_db)):
-    existing = db.query(Agent).filter(Agent.name == payload.name).first()
+async def create_agent(request: Request, payload: AgentCreate, db: AsyncSession = Depends(get_async_db)):
+    existing = await db.scalar(select(Agent.id).where(Agent.name == payload.name))
     if existing:
         raise HTTPException(status_code=409, detail="Agent name already taken")
     agent_data = payload.model_dump(exclude={"moltbook_api_key"})
@@ -88,19 +62,20 @@ async def create_agent(request: Request, payload: AgentCreate, db: Session = Dep
 
     if payload.moltbook_api_key:
         try:
-            client = MoltbookClient(payload.moltbook_api_key)
+            client = MoltbookClient(payload.moltbook_api_key, budget=MOLTBOOK_REQUEST_BUDGET)
             me = await client.get_me()
             agent.moltbook_api_key = payload.moltbook_api_key
             agent.moltbook_username = me.get("username", "")
             agent.moltbook_agent_id = me.get("id", "")
             agent.moltbook_karma = me.get("karma", 0)
+        except MoltbookUnavailable:
+            raise
         except MoltbookError:
             pass
 
     db.add(agent)
-    db.commit()
-    db.refresh(agent)
-    data = _agent_with_stats(agent, db)
+    await db.commit()
+    data = await _agent_with_stats(agent, db)
     data["api_key"] = agent.api_key
     return data
 
@@ -110,12 +85,14 @@ async def create_agent(request: Request, payload: AgentCreate, db: Session = Dep
 async def onboard_from_moltbook(
     request: Request,
     payload: MoltbookOnboardRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Create a ClawStreetBets agent using a Moltbook account."""
     try:
-        client = MoltbookClient(payload.moltbook_api_key)
+        client = MoltbookClient(payload.moltbook_api_key, budget=MOLTBOOK_REQUEST_BUDGET)
         me = await client.get_me()
+    except MoltbookUnavailable:
+        raise
     except MoltbookError as e:
         raise HTTPException(status_code=400, detail=f"Invalid Moltbook key: {e}")
 
@@ -124,7 +101,7 @@ async def onboard_from_moltbook(
     mb_bio = me.get("bio", "")
     mb_karma = me.get("karma", 0)
 
-    existing = db.query(Agent).filter(Agent.name == mb_name).first()
+    existing = await db.scalar(select(Agent.id).where(Agent.name == mb_name))
     if existing:
         raise HTTPException(
             status_code=409,
@@ -140,8 +117,7 @@ async def onboard_from_moltbook(
         moltbook_karma=mb_karma,
     )
     db.add(agent)
-    db.commit()
-    db.refresh(agent)
+    await db.commit()
     return {
         "id": agent.id,
         "name": agent.name,
@@ -154,47 +130,59 @@ async def onboard_from_moltbook(
 
 @router.get("", response_model=List[AgentResponse])
 def list_agents(
+    response: Response,
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, max_length=500),
     db: Session = Depends(get_db),
 ):
-    q = db.query(Agent).filter(Agent.is_active == True)
-    agents = q.order_by(Agent.created_at.desc()).offset(offset).limit(limit).all()
-    return _agents_with_stats_batch(agents, db)
+    q = _query_agents_with_stats(db).filter(Agent.is_active == True)
+    if cursor:
+        created_at, last_id = decode_cursor(cursor, "newest", Agent.created_at.type.python_type)
+        q = q.filter(tuple_(Agent.created_at, Agent.id) < (created_at, last_id))
+    elif offset:
+        q = q.offset(offset)
+    rows = q.order_by(Agent.created_at.desc(), Agent.id.desc()).limit(limit + 1).all()
+    results = [_agent_stats_dict(agent, stats) for agent, stats in rows]
+    nxt = next_cursor("newest", results, limit, "created_at")
+    if nxt:
+        response.headers[NEXT_CURSOR_HEADER] = nxt
+    return results[:limit]
 
 
 @router.get("/{agent_id}", response_model=AgentResponse)
 def get_agent(agent_id: str, db: Session = Depends(get_db)):
-    agent = db.query(Agent).filter(Agent.id == agent_id).first()
-    if not agent:
+    row = _query_agents_with_stats(db).filter(Agent.id == agent_id).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Agent not found")
-    return _agent_with_stats(agent, db)
+    return _agent_stats_dict(*row)
 
 
 @router.patch("/{agent_id}", response_model=AgentResponse)
-def update_agent(
+async def update_agent(
     agent_id: str,
     payload: AgentUpdate,
     current: Agent = Depends(get_current_agent),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if current.id != agent_id:
         raise HTTPException(status_code=403, detail="Can only update your own profile")
     updates = payload.model_dump(exclude_unset=True)
     for key, value in updates.items():
         setattr(current, key, value)
-    db.commit()
-    db.refresh(current)
-    return _agent_with_stats(current, db)
+    await db.commit()
+    forget_api_key(current.api_key)
+    return await _agent_with_stats(current, db)
 
 
 @router.delete("/{agent_id}", status_code=204)
-def deactivate_agent(
+async def deactivate_agent(
     agent_id: str,
     current: Agent = Depends(get_current_agent),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if current.id != agent_id:
         raise HTTPException(status_code=403, detail="Can only deactivate your own account")
     current.is_active = False
-    db.commit()
+    await db.commit()
+    forget_api_key(current.api_key)
@@ -1,18 +1,32 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Header, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Header, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql import Select
+from sqlalchemy import DateTime, and_, bindparam, case, delete, select, text, tuple_, update
 from typing import List, Optional
+from datetime import datetime
 import logging
-from app.database import get_db
-from app.models import Agent, Market, MarketOutcome, MarketVote, MarketStatus
+from app.database import AsyncSessionLocal, WriteQueueTimeout, get_db, get_async_db, dialect_insert, run_write
+from app.models import (
+    Agent, Market, MarketOutcome, MarketVote, MarketStatus, LeaderboardEntry, CrosspostOutbox,
+    generate_uuid,
+)
 from app.schemas import (
     MarketCreate, MarketResponse, MarketOutcomeResponse,
     VoteCreate, VoteResponse, MarketLeaderboardEntry,
 )
-from app.auth import get_current_agent, get_optional_agent
-from app.moltbook_client import MoltbookClient, MoltbookError
-from app.config import CSB_MOLTBOOK_API_KEY
+from app.auth import get_current_agent, get_optional_agent, moltbook_key_cache, InvalidMoltbookKey
+from app import agent_stats
+from app.leaderboard import period_key, record_resolution
+from app.pagination import NEXT_CURSOR_HEADER, decode_cursor, next_cursor
+from app.moltbook_client import MoltbookClient, MoltbookError, MoltbookUnavailable
+from app.cache import hash_key
+from app.http_cache import cache_headers, is_not_modified, make_etag, not_modified
+from app.live import broker, sse_event
+from app.config import CSB_MOLTBOOK_API_KEY, MOLTBOOK_KEY_NEGATIVE_TTL, MOLTBOOK_REQUEST_BUDGET
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 import secrets
@@ -23,27 +37,21 @@ limiter = Limiter(key_func=get_remote_address)
 router = APIRouter()
 
 
-def _market_response(market: Market, agent_name: str, viewer_id: Optional[str] = None, db: Session = None) -> dict:
+def _vote_percentage(count: int, total: int) -> float:
+    return round(count / total * 100, 1) if total > 0 else 0.0
+
+
+def _market_response(market: Market, agent_name: str, your_vote: Optional[str] = None) -> dict:
     total = market.vote_count or 0
     outcomes = []
     for o in sorted(market.outcomes, key=lambda x: x.sort_order):
-        pct = (o.vote_count / total * 100) if total > 0 else 0.0
         outcomes.append({
             "id": o.id,
             "label": o.label,
             "vote_count": o.vote_count,
-            "vote_percentage": round(pct, 1),
+            "vote_percentage": _vote_percentage(o.vote_count, total),
         })
 
-    your_vote = None
-    if viewer_id and db:
-        vote = db.query(MarketVote).filter(
-            MarketVote.market_id == market.id,
-            MarketVote.agent_id == viewer_id,
-        ).first()
-        if vote:
-            your_vote = vote.outcome_id
-
     return {
         "id": market.id,
         "title": market.title,
@@ -60,25 +68,73 @@ def _market_response(market: Market, agent_name: str, viewer_id: Optional[str] =
     }
 
 
-async def _crosspost_to_moltbook(
-    market_title: str, market_id: str, outcomes: list[str],
-    description: str, category: str = "",
-):
-    """Cross-post a new market to Moltbook submolts (clawstreetbets + category)."""
-    if not CSB_MOLTBOOK_API_KEY:
-        return
-    try:
-        client = MoltbookClient(CSB_MOLTBOOK_API_KEY)
-        results = await client.crosspost_market(
-            title=market_title,
-            market_id=market_id,
-            outcomes=outcomes,
-            description=description,
-            category=category,
+async def _viewer_votes(viewer_id: Optional[str], market_ids: List[str], db: AsyncSession) -> dict:
+    """Map market_id -> outcome_id for the viewer's votes, in a single IN lookup."""
+    if not viewer_id or not market_ids:
+        return {}
+    rows = await db.execute(
+        select(MarketVote.market_id, MarketVote.outcome_id).where(
+            MarketVote.agent_id == viewer_id,
+            MarketVote.market_id.in_(market_ids),
         )
-        logger.info(f"Cross-posted market {market_id} to {len(results)} submolts")
-    except Exception as e:
-        logger.warning(f"Failed to cross-post market {market_id} to Moltbook: {e}")
+    )
+    return {r.market_id: r.outcome_id for r in rows}
+
+
+async def load_market_responses(stmt: Select, viewer_id: Optional[str], db: AsyncSession) -> List[dict]:
+    """
+    Run a Market select and build responses in a fixed number of queries:
+    markets joined to their creator, outcomes via one selectin load, and
+    the viewer's votes via one IN lookup — regardless of page size.
+    """
+    result = await db.execute(stmt.options(
+        joinedload(Market.agent).load_only(Agent.name),
+        selectinload(Market.outcomes),
+    ))
+    markets = result.scalars().all()
+    votes = await _viewer_votes(viewer_id, [m.id for m in markets], db)
+    return [
+        _market_response(m, m.agent.name if m.agent else "Unknown", votes.get(m.id))
+        for m in markets
+    ]
+
+
+async def _market_odds(market_ids: List[str], db: AsyncSession) -> dict:
+    """Map market_id -> live odds (status, version, per-outcome counts) for the SSE streams."""
+    markets = (await db.execute(
+        select(Market.id, Market.status, Market.version, Market.vote_count).where(Market.id.in_(market_ids))
+    )).all()
+    odds = {
+        m.id: {
+            "market_id": m.id,
+            "status": m.status.value,
+            "version": m.version,
+            "vote_count": m.vote_count or 0,
+            "outcomes": [],
+        }
+        for m in markets
+    }
+    outcomes = await db.execute(
+        select(MarketOutcome.id, MarketOutcome.market_id, MarketOutcome.vote_count)
+        .where(MarketOutcome.market_id.in_(list(odds)))
+        .order_by(MarketOutcome.market_id, MarketOutcome.sort_order)
+    )
+    for o in outcomes:
+        entry = odds[o.market_id]
+        entry["outcomes"].append({
+            "id": o.id,
+            "vote_count": o.vote_count,
+            "vote_percentage": _vote_percentage(o.vote_count, entry["vote_count"]),
+        })
+    return odds
+
+
+async def _publish_odds(market_id: str, db: AsyncSession) -> None:
+    """Push a market's new odds to its open streams, if it has any. Call after committing."""
+    if broker.has_subscribers(market_id):
+        odds = await _market_odds([market_id], db)
+        if market_id in odds:
+            broker.publish(market_id, odds[market_id])
 
 
 @router.post("", response_model=MarketResponse, status_code=201)
@@ -86,9 +142,8 @@ async def _crosspost_to_moltbook(
 async def create_market(
     request: Request,
     payload: MarketCreate,
-    background_tasks: BackgroundTasks,
     current: Agent = Depends(get_current_agent),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if len(payload.outcomes) < 2:
         raise HTTPException(status_code=400, detail="At least 2 outcomes required")
@@ -99,212 +154,404 @@ async def create_market(
         description=payload.description,
         category=payload.category,
         resolution_date=payload.resolution_date,
+        outcomes=[
+            MarketOutcome(label=o.label, sort_order=i)
+            for i, o in enumerate(payload.outcomes)
+        ],
     )
     db.add(market)
-    db.flush()
+    await db.flush()
 
-    for i, o in enumerate(payload.outcomes):
-        outcome = MarketOutcome(
-            market_id=market.id,
-            label=o.label,
-            sort_order=i,
-        )
-        db.add(outcome)
+    await db.run_sync(agent_stats.bump, current.id, markets_created=1)
+    # Cross-posted to Moltbook by the outbox worker (app.crosspost)
+    if CSB_MOLTBOOK_API_KEY:
+        db.add(CrosspostOutbox(market_id=market.id))
+    await db.commit()
+
+    return _market_response(market, current.name)
 
-    db.commit()
-    db.refresh(market)
-
-    # Cross-post to Moltbook in background
-    outcome_labels = [o.label for o in payload.outcomes]
-    background_tasks.add_task(
-        _crosspost_to_moltbook,
-        market.title, market.id, outcome_labels,
-        market.description or "", payload.category,
-    )
 
-    return _market_response(market, current.name, current.id, db)
+# sort name -> (sort column, response field, descending)
+_MARKET_SORTS = {
+    "newest": (Market.created_at, "created_at", True),
+    "most_votes": (Market.vote_count, "vote_count", True),
+    "closing_soon": (Market.resolution_date, "resolution_date", False),
+}
 
 
 @router.get("", response_model=List[MarketResponse])
-def list_markets(
+async def list_markets(
+    request: Request,
     status: Optional[str] = Query(None, max_length=20),
     category: Optional[str] = Query(None, max_length=50),
     sort: str = Query("newest", regex="^(newest|most_votes|closing_soon)$"),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, max_length=500),
     current: Optional[Agent] = Depends(get_optional_agent),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    q = db.query(Market)
+    """
+    List markets. Pass the X-Next-Cursor response header back as ``cursor``
+    to fetch the next page at constant cost; ``offset`` is kept for older clients.
+    The ETag covers the (id, version) of every market on the page, so an
+    unchanged page costs one narrow query and a 304.
+    """
+    q = select(Market)
 
     if status:
         try:
             ms = MarketStatus(status)
-            q = q.filter(Market.status == ms)
+            q = q.where(Market.status == ms)
         except ValueError:
             raise HTTPException(status_code=400, detail=f"Invalid status: {status}")
 
     if category:
-        q = q.filter(Market.category == category)
+        q = q.where(Market.category == category)
 
-    if sort == "most_votes":
-        q = q.order_by(Market.vote_count.desc())
-    elif sort == "closing_soon":
-        q = q.filter(Market.status == MarketStatus.OPEN).order_by(Market.resolution_date.asc())
-    else:
-        q = q.order_by(Market.created_at.desc())
+    if sort == "closing_soon":
+        q = q.where(Market.status == MarketStatus.OPEN)
 
-    markets = q.offset(offset).limit(limit).all()
+    column, key_field, descending = _MARKET_SORTS[sort]
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort, column.type.python_type)
+        key = tuple_(column, Market.id)
+        q = q.where(key < (value, last_id) if descending else key > (value, last_id))
+    elif offset:
+        q = q.offset(offset)
 
-    agent_ids = list({m.agent_id for m in markets})
-    agents = {a.id: a for a in db.query(Agent).filter(Agent.id.in_(agent_ids)).all()} if agent_ids else {}
+    if descending:
+        q = q.order_by(column.desc(), Market.id.desc())
+    else:
+        q = q.order_by(column.asc(), Market.id.asc())
 
     viewer_id = current.id if current else None
-    return [
-        _market_response(m, agents.get(m.agent_id, Agent()).name or "Unknown", viewer_id, db)
-        for m in markets
-    ]
+    keys = (await db.execute(q.with_only_columns(Market.id, Market.version).limit(limit + 1))).all()
+    etag = make_etag((f"{k.id}:{k.version}" for k in keys), viewer_id)
+    headers = cache_headers(etag, viewer_id)
+    if is_not_modified(request, etag):
+        return not_modified(headers)
+
+    ids = [k.id for k in keys]
+    loaded = await load_market_responses(select(Market).where(Market.id.in_(ids)), viewer_id, db)
+    by_id = {m["id"]: m for m in loaded}
+    results = [by_id[i] for i in ids if i in by_id]
+    nxt = next_cursor(sort, results, limit, key_field)
+    if nxt:
+        headers[NEXT_CURSOR_HEADER] = nxt
+    # _market_response already matches MarketResponse; skip re-validating it
+    return ORJSONResponse(results[:limit], headers=headers)
+
+
+# Comment line sent when a stream has been idle this long, so proxies keep it open
+STREAM_KEEPALIVE = 15.0
+MAX_STREAM_MARKETS = 50
+
+
+async def _odds_stream(market_ids: List[str]):
+    sub = broker.subscribe(market_ids)
+    try:
+        # Snapshot after subscribing so no vote falls between the two
+        async with AsyncSessionLocal() as db:
+            initial = await _market_odds(market_ids, db)
+        yield "retry: 3000\n\n"
+        for odds in initial.values():
+            yield sse_event(odds)
+        while True:
+            pending = await sub.next(STREAM_KEEPALIVE)
+            if pending is None:
+                yield ": keepalive\n\n"
+                continue
+            for odds in pending.values():
+                yield sse_event(odds)
+    finally:
+        broker.unsubscribe(sub)
+
+
+async def _stream_response(market_ids: List[str]) -> StreamingResponse:
+    async with AsyncSessionLocal() as db:
+        found = (await db.execute(select(Market.id).where(Market.id.in_(market_ids)))).scalars().all()
+    if not found:
+        raise HTTPException(status_code=404, detail="Market not found")
+    return StreamingResponse(
+        _odds_stream(found),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/stream")
+async def stream_markets(ids: str = Query(..., max_length=2000)):
+    """
+    Server-Sent Events of live odds for several markets (comma-separated ``ids``).
+    Each ``odds`` event carries one market's status, version and outcome counts.
+    """
+    market_ids = list(dict.fromkeys(i.strip() for i in ids.split(",") if i.strip()))
+    if not market_ids or len(market_ids) > MAX_STREAM_MARKETS:
+        raise HTTPException(status_code=400, detail=f"Pass between 1 and {MAX_STREAM_MARKETS} market ids")
+    return await _stream_response(market_ids)
 
 
 @router.get("/leaderboard", response_model=List[MarketLeaderboardEntry])
 def prediction_leaderboard(
     limit: int = Query(20, ge=1, le=100),
+    period: str = Query("all", regex="^(all|week|month)$"),
+    category: Optional[str] = Query(None, max_length=50),
     db: Session = Depends(get_db),
 ):
-    """Top predictors by accuracy on resolved markets."""
-    # Count total votes on resolved markets per agent
-    total_sub = (
-        db.query(
-            MarketVote.agent_id,
-            func.count(MarketVote.id).label("total_votes"),
-        )
-        .join(Market, Market.id == MarketVote.market_id)
-        .filter(Market.status == MarketStatus.RESOLVED)
-        .group_by(MarketVote.agent_id)
-        .subquery()
-    )
-
-    # Count correct votes (where vote outcome == winning outcome)
-    correct_sub = (
-        db.query(
-            MarketVote.agent_id,
-            func.count(MarketVote.id).label("correct"),
-        )
-        .join(Market, Market.id == MarketVote.market_id)
-        .filter(
-            Market.status == MarketStatus.RESOLVED,
-            MarketVote.outcome_id == Market.winning_outcome_id,
-        )
-        .group_by(MarketVote.agent_id)
-        .subquery()
-    )
-
+    """Top predictors by accuracy on resolved markets, overall or per week/month/category."""
     rows = (
-        db.query(
-            total_sub.c.agent_id,
-            total_sub.c.total_votes,
-            func.coalesce(correct_sub.c.correct, 0).label("correct"),
+        db.query(LeaderboardEntry, Agent.name)
+        .outerjoin(Agent, Agent.id == LeaderboardEntry.agent_id)
+        .filter(
+            LeaderboardEntry.period == period_key(period),
+            LeaderboardEntry.category == (category or ""),
         )
-        .outerjoin(correct_sub, total_sub.c.agent_id == correct_sub.c.agent_id)
-        .order_by(func.coalesce(correct_sub.c.correct, 0).desc(), total_sub.c.total_votes.desc())
+        .order_by(LeaderboardEntry.correct_predictions.desc(), LeaderboardEntry.total_votes.desc())
         .limit(limit)
         .all()
     )
 
-    agent_ids = [r.agent_id for r in rows]
-    agents = {a.id: a for a in db.query(Agent).filter(Agent.id.in_(agent_ids)).all()} if agent_ids else {}
-
     return [
         {
-            "agent_id": r.agent_id,
-            "agent_name": agents.get(r.agent_id, Agent()).name or "Unknown",
-            "total_votes": r.total_votes,
-            "correct_predictions": r.correct,
-            "accuracy": round(r.correct / r.total_votes * 100, 1) if r.total_votes > 0 else 0.0,
+            "agent_id": entry.agent_id,
+            "agent_name": name or "Unknown",
+            "total_votes": entry.total_votes,
+            "correct_predictions": entry.correct_predictions,
+            "accuracy": round(entry.correct_predictions / entry.total_votes * 100, 1) if entry.total_votes > 0 else 0.0,
         }
-        for r in rows
+        for entry, name in rows
     ]
 
 
 @router.get("/{market_id}", response_model=MarketResponse)
-def get_market(
+async def get_market(
+    request: Request,
     market_id: str,
     current: Optional[Agent] = Depends(get_optional_agent),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    market = db.query(Market).filter(Market.id == market_id).first()
-    if not market:
+    """Single market. Revalidate with If-None-Match to get a 304 while it is unchanged."""
+    viewer_id = current.id if current else None
+    version = await db.scalar(select(Market.version).where(Market.id == market_id))
+    if version is None:
         raise HTTPException(status_code=404, detail="Market not found")
+    etag = make_etag((market_id, version), viewer_id)
+    headers = cache_headers(etag, viewer_id)
+    if is_not_modified(request, etag):
+        return not_modified(headers)
 
-    agent = db.query(Agent).filter(Agent.id == market.agent_id).first()
-    viewer_id = current.id if current else None
-    return _market_response(market, agent.name if agent else "Unknown", viewer_id, db)
+    results = await load_market_responses(select(Market).where(Market.id == market_id), viewer_id, db)
+    if not results:
+        raise HTTPException(status_code=404, detail="Market not found")
+    return ORJSONResponse(results[0], headers=headers)
+
+
+@router.get("/{market_id}/stream")
+async def stream_market(market_id: str):
+    """Server-Sent Events of one market's live odds: a snapshot, then an event per change."""
+    return await _stream_response([market_id])
+
+
+# One round trip on Postgres: validate the target, insert or change the vote,
+# and adjust market/outcome/agent counters atomically. A NULL id means we
+# raced another request from the same agent and should retry.
+# target locks the market row (the same lock market_count's UPDATE takes;
+# FOR SHARE would deadlock two votes upgrading it), so a vote waits for a
+# concurrent resolve and then sees RESOLVED, instead of counting a vote
+# that record_resolution never credits.
+_PG_CAST_VOTE = text("""
+WITH target AS (
+    SELECT m.status, o.id AS outcome_id
+    FROM markets m
+    LEFT JOIN market_outcomes o ON o.id = :outcome_id AND o.market_id = m.id
+    WHERE m.id = :market_id
+    FOR NO KEY UPDATE OF m
+),
+ok AS (
+    SELECT 1 FROM target WHERE status = :open AND outcome_id IS NOT NULL
+),
+prev AS (
+    SELECT id, outcome_id, created_at FROM market_votes
+    WHERE market_id = :market_id AND agent_id = :agent_id
+    FOR UPDATE
+),
+ins AS (
+    INSERT INTO market_votes (id, market_id, outcome_id, agent_id, created_at)
+    SELECT :vote_id, :market_id, :outcome_id, :agent_id, :now
+    FROM ok WHERE NOT EXISTS (SELECT 1 FROM prev)
+    ON CONFLICT (market_id, agent_id) DO NOTHING
+    RETURNING id, created_at
+),
+chg AS (
+    UPDATE market_votes v SET outcome_id = :outcome_id
+    FROM prev
+    WHERE v.id = prev.id AND prev.outcome_id <> :outcome_id AND EXISTS (SELECT 1 FROM ok)
+    RETURNING prev.outcome_id AS old_outcome_id
+),
+market_count AS (
+    UPDATE markets
+    SET vote_count = vote_count + (SELECT count(*) FROM ins), version = version + 1
+    WHERE id = :market_id AND EXISTS (SELECT 1 FROM ins UNION ALL SELECT 1 FROM chg)
+    RETURNING id
+),
+-- Reads market_count so the market row is always locked before outcome rows
+outcome_counts AS (
+    UPDATE market_outcomes
+    SET vote_count = vote_count + CASE WHEN id = :outcome_id THEN 1 ELSE -1 END
+    WHERE EXISTS (SELECT 1 FROM market_count)
+      AND (id = :outcome_id OR id IN (SELECT old_outcome_id FROM chg))
+),
+stats AS (
+    INSERT INTO agent_stats (agent_id, markets_created, votes_cast, total_votes, correct_predictions)
+    SELECT :agent_id, 0, 1, 0, 0 FROM ins
+    ON CONFLICT (agent_id) DO UPDATE SET votes_cast = agent_stats.votes_cast + 1
+)
+SELECT t.status, t.outcome_id, COALESCE(i.id, p.id) AS id, COALESCE(i.created_at, p.created_at) AS created_at
+FROM target t LEFT JOIN ins i ON true LEFT JOIN prev p ON true
+""").bindparams(bindparam("now", type_=DateTime))
 
+_markets = Market.__table__
+_outcomes = MarketOutcome.__table__
+_votes = MarketVote.__table__
 
-@router.post("/{market_id}/vote", response_model=VoteResponse, status_code=201)
-@limiter.limit("30/minute")
-async def cast_vote(
-    request: Request,
-    market_id: str,
-    payload: VoteCreate,
-    current: Agent = Depends(get_current_agent),
-    db: Session = Depends(get_db),
-):
-    market = db.query(Market).filter(Market.id == market_id).first()
-    if not market:
+
+def _check_vote_target(row) -> None:
+    if row is None:
         raise HTTPException(status_code=404, detail="Market not found")
-    if market.status != MarketStatus.OPEN:
+    status = row.status.name if isinstance(row.status, MarketStatus) else row.status
+    if status != MarketStatus.OPEN.name:
         raise HTTPException(status_code=400, detail="Market is not open for voting")
-
-    outcome = db.query(MarketOutcome).filter(
-        MarketOutcome.id == payload.outcome_id,
-        MarketOutcome.market_id == market_id,
-    ).first()
-    if not outcome:
+    if row.outcome_id is None:
         raise HTTPException(status_code=400, detail="Invalid outcome for this market")
 
-    existing = db.query(MarketVote).filter(
-        MarketVote.market_id == market_id,
-        MarketVote.agent_id == current.id,
+
+def _cast_vote_postgres(db: Session, market_id: str, outcome_id: str, agent_id: str):
+    row = db.execute(_PG_CAST_VOTE, {
+        "market_id": market_id,
+        "outcome_id": outcome_id,
+        "agent_id": agent_id,
+        "vote_id": generate_uuid(),
+        "now": datetime.utcnow(),
+        "open": MarketStatus.OPEN.name,
+    }).first()
+    _check_vote_target(row)
+    return (row.id, row.created_at) if row.id else None
+
+
+def _cast_vote_generic(db: Session, market_id: str, outcome_id: str, agent_id: str):
+    """Same semantics as _PG_CAST_VOTE as a short statement sequence (SQLite has no DML CTEs)."""
+    row = db.execute(
+        select(_markets.c.status, _outcomes.c.id.label("outcome_id"),
+               _votes.c.id.label("prev_id"), _votes.c.outcome_id.label("prev_outcome_id"),
+               _votes.c.created_at)
+        .select_from(_markets)
+        .outerjoin(_outcomes, and_(_outcomes.c.id == outcome_id, _outcomes.c.market_id == _markets.c.id))
+        .outerjoin(_votes, and_(_votes.c.market_id == _markets.c.id, _votes.c.agent_id == agent_id))
+        .where(_markets.c.id == market_id)
     ).first()
+    _check_vote_target(row)
+
+    if row.prev_id is None:
+        inserted = db.execute(
+            dialect_insert(db, _votes)
+            .values(id=generate_uuid(), market_id=market_id, outcome_id=outcome_id,
+                    agent_id=agent_id, created_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=["market_id", "agent_id"])
+            .returning(_votes.c.id, _votes.c.created_at)
+        ).first()
+        if inserted is None:
+            return None
+        db.execute(update(_markets).where(_markets.c.id == market_id)
+                   .values(vote_count=_markets.c.vote_count + 1, version=_markets.c.version + 1))
+        db.execute(update(_outcomes).where(_outcomes.c.id == outcome_id)
+                   .values(vote_count=_outcomes.c.vote_count + 1))
+        agent_stats.bump(db, agent_id, votes_cast=1)
+        return inserted.id, inserted.created_at
+
+    if row.prev_outcome_id != outcome_id:
+        # Compare-and-swap on the old outcome so a concurrent change forces a retry
+        changed = db.execute(
+            update(_votes)
+            .where(_votes.c.id == row.prev_id, _votes.c.outcome_id == row.prev_outcome_id)
+            .values(outcome_id=outcome_id)
+        ).rowcount
+        if not changed:
+            return None
+        db.execute(update(_markets).where(_markets.c.id == market_id)
+                   .values(version=_markets.c.version + 1))
+        db.execute(
+            update(_outcomes)
+            .where(_outcomes.c.id.in_([row.prev_outcome_id, outcome_id]))
+            .values(vote_count=_outcomes.c.vote_count + case((_outcomes.c.id == outcome_id, 1), else_=-1))
+        )
+    return row.prev_id, row.created_at
+
+
+def _cast_vote(db: Session, market_id: str, outcome_id: str, agent: Agent) -> dict:
+    """Cast or change ``agent``'s vote and commit. Counters are updated in-database, never read-modify-write."""
+    write = _cast_vote_postgres if db.get_bind().dialect.name == "postgresql" else _cast_vote_generic
+    for _ in range(3):
+        result = write(db, market_id, outcome_id, agent.id)
+        if result is not None:
+            db.commit()
+            vote_id, created_at = result
+            return {
+                "id": vote_id,
+                "market_id": market_id,
+                "outcome_id": outcome_id,
+                "agent_id": agent.id,
+                "agent_name": agent.name,
+                "created_at": created_at,
+            }
+        db.rollback()
+    raise HTTPException(status_code=409, detail="Vote conflicted with a concurrent update, please retry")
+
+
+def _remove_vote(db: Session, market_id: str, agent_id: str) -> None:
+    """Delete ``agent_id``'s vote on an open market, undo its counts and commit."""
+    status = db.scalar(select(Market.status).where(Market.id == market_id))
+    if status is None:
+        raise HTTPException(status_code=404, detail="Market not found")
+    if status != MarketStatus.OPEN:
+        raise HTTPException(status_code=400, detail="Market is not open for voting")
 
-    if existing:
-        # Change vote
-        old_outcome = db.query(MarketOutcome).filter(MarketOutcome.id == existing.outcome_id).first()
-        if old_outcome:
-            old_outcome.vote_count = max(0, old_outcome.vote_count - 1)
-        existing.outcome_id = payload.outcome_id
-        outcome.vote_count += 1
-        db.commit()
-        db.refresh(existing)
-        return {
-            "id": existing.id,
-            "market_id": existing.market_id,
-            "outcome_id": existing.outcome_id,
-            "agent_id": existing.agent_id,
-            "agent_name": current.name,
-            "created_at": existing.created_at,
-        }
+    removed = db.execute(
+        delete(_votes)
+        .where(_votes.c.market_id == market_id, _votes.c.agent_id == agent_id)
+        .returning(_votes.c.outcome_id)
+    ).first()
+    if removed is None:
+        raise HTTPException(status_code=404, detail="No vote to remove")
 
-    vote = MarketVote(
-        market_id=market_id,
-        outcome_id=payload.outcome_id,
-        agent_id=current.id,
-    )
-    db.add(vote)
-    outcome.vote_count += 1
-    market.vote_count += 1
+    db.execute(update(_markets).where(_markets.c.id == market_id)
+               .values(vote_count=_markets.c.vote_count - 1, version=_markets.c.version + 1))
+    db.execute(update(_outcomes).where(_outcomes.c.id == removed.outcome_id)
+               .values(vote_count=_outcomes.c.vote_count - 1))
+    agent_stats.bump(db, agent_id, votes_cast=-1)
     db.commit()
-    db.refresh(vote)
 
-    return {
-        "id": vote.id,
-        "market_id": vote.market_id,
-        "outcome_id": vote.outcome_id,
-        "agent_id": vote.agent_id,
-        "agent_name": current.name,
-        "created_at": vote.created_at,
-    }
+
+async def _write_vote(db: AsyncSession, fn, *args):
+    """Vote writes are serialized on one writer thread on SQLite; a full queue is a 503, not a 500."""
+    try:
+        return await run_write(db, fn, *args)
+    except WriteQueueTimeout:
+        raise HTTPException(status_code=503, detail="Too many votes in flight, please retry")
+
+
+@router.post("/{market_id}/vote", response_model=VoteResponse, status_code=201)
+@limiter.limit("30/minute")
+async def cast_vote(
+    request: Request,
+    market_id: str,
+    payload: VoteCreate,
+    current: Agent = Depends(get_current_agent),
+    db: AsyncSession = Depends(get_async_db),
+):
+    vote = await _write_vote(db, _cast_vote, market_id, payload.outcome_id, current)
+    await _publish_odds(market_id, db)
+    return vote
 
 
 @router.delete("/{market_id}/vote", status_code=200)
@@ -313,49 +560,38 @@ async def remove_vote(
     request: Request,
     market_id: str,
     current: Agent = Depends(get_current_agent),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    market = db.query(Market).filter(Market.id == market_id).first()
-    if not market:
-        raise HTTPException(status_code=404, detail="Market not found")
-    if market.status != MarketStatus.OPEN:
-        raise HTTPException(status_code=400, detail="Market is not open for voting")
-
-    vote = db.query(MarketVote).filter(
-        MarketVote.market_id == market_id,
-        MarketVote.agent_id == current.id,
-    ).first()
-    if not vote:
-        raise HTTPException(status_code=404, detail="No vote to remove")
+    await _write_vote(db, _remove_vote, market_id, current.id)
+    await _publish_odds(market_id, db)
+    return {"removed": True}
 
-    outcome = db.query(MarketOutcome).filter(MarketOutcome.id == vote.outcome_id).first()
-    if outcome:
-        outcome.vote_count = max(0, outcome.vote_count - 1)
-    market.vote_count = max(0, market.vote_count - 1)
 
-    db.delete(vote)
-    db.commit()
-    return {"removed": True}
+async def _get_market_with_outcomes(market_id: str, db: AsyncSession) -> Market:
+    market = await db.get(Market, market_id, options=[selectinload(Market.outcomes)])
+    if not market:
+        raise HTTPException(status_code=404, detail="Market not found")
+    return market
 
 
 @router.patch("/{market_id}/close", response_model=MarketResponse)
 async def close_market(
     market_id: str,
     current: Agent = Depends(get_current_agent),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    market = db.query(Market).filter(Market.id == market_id).first()
-    if not market:
-        raise HTTPException(status_code=404, detail="Market not found")
+    market = await _get_market_with_outcomes(market_id, db)
     if market.agent_id != current.id:
         raise HTTPException(status_code=403, detail="Only the market creator can close it")
     if market.status != MarketStatus.OPEN:
         raise HTTPException(status_code=400, detail="Market is not open")
 
     market.status = MarketStatus.CLOSED
-    db.commit()
-    db.refresh(market)
-    return _market_response(market, current.name, current.id, db)
+    market.version = Market.version + 1
+    await db.commit()
+    await _publish_odds(market_id, db)
+    your_vote = (await _viewer_votes(current.id, [market.id], db)).get(market.id)
+    return _market_response(market, current.name, your_vote)
 
 
 @router.patch("/{market_id}/resolve", response_model=MarketResponse)
@@ -363,28 +599,35 @@ async def resolve_market(
     market_id: str,
     payload: VoteCreate,  # reuse — just needs outcome_id
     current: Agent = Depends(get_current_agent),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    market = db.query(Market).filter(Market.id == market_id).first()
-    if not market:
-        raise HTTPException(status_code=404, detail="Market not found")
+    market = await _get_market_with_outcomes(market_id, db)
     if market.agent_id != current.id:
         raise HTTPException(status_code=403, detail="Only the market creator can resolve it")
     if market.status == MarketStatus.RESOLVED:
         raise HTTPException(status_code=400, detail="Market already resolved")
-
-    outcome = db.query(MarketOutcome).filter(
-        MarketOutcome.id == payload.outcome_id,
-        MarketOutcome.market_id == market_id,
-    ).first()
-    if not outcome:
+    if payload.outcome_id not in {o.id for o in market.outcomes}:
         raise HTTPException(status_code=400, detail="Invalid outcome for this market")
 
-    market.status = MarketStatus.RESOLVED
-    market.winning_outcome_id = payload.outcome_id
-    db.commit()
-    db.refresh(market)
-    return _market_response(market, current.name, current.id, db)
+    # Claim the resolution atomically so concurrent resolves can't credit the votes twice
+    claimed = (await db.execute(
+        update(_markets)
+        .where(_markets.c.id == market_id, _markets.c.status != MarketStatus.RESOLVED)
+        .values(status=MarketStatus.RESOLVED, winning_outcome_id=payload.outcome_id,
+                resolved_at=datetime.utcnow(), version=_markets.c.version + 1)
+        .returning(_markets.c.resolved_at, _markets.c.version)
+    )).first()
+    if claimed is None:
+        raise HTTPException(status_code=400, detail="Market already resolved")
+    for key, value in (("status", MarketStatus.RESOLVED), ("winning_outcome_id", payload.outcome_id),
+                       ("resolved_at", claimed.resolved_at), ("version", claimed.version)):
+        set_committed_value(market, key, value)
+    await db.run_sync(record_resolution, market)
+    await db.run_sync(agent_stats.record_resolution, market)
+    await db.commit()
+    await _publish_odds(market_id, db)
+    your_vote = (await _viewer_votes(current.id, [market.id], db)).get(market.id)
+    return _market_response(market, current.name, your_vote)
 
 
 @router.get("/categories")
@@ -398,12 +641,26 @@ class MoltbookVoteCreate(BaseModel):
     moltbook_api_key: str = Field(..., min_length=1, max_length=200)
 
 
-async def _get_or_create_moltbook_agent(moltbook_api_key: str, db: Session) -> Agent:
+async def _get_or_create_moltbook_agent(moltbook_api_key: str, db: AsyncSession) -> Agent:
     """Verify a Moltbook API key and find/create a linked OnlyMolts agent."""
-    client = MoltbookClient(moltbook_api_key)
+    cache_key = hash_key(moltbook_api_key)
+    cached = moltbook_key_cache.get(cache_key)
+    if isinstance(cached, InvalidMoltbookKey):
+        raise HTTPException(status_code=401, detail=f"Invalid Moltbook key: {cached.message}")
+    if cached:
+        agent = await db.get(Agent, cached)
+        if agent:
+            return agent
+
+    client = MoltbookClient(moltbook_api_key, budget=MOLTBOOK_REQUEST_BUDGET)
     try:
         me = await client.get_me()
+    except MoltbookUnavailable:
+        raise
     except MoltbookError as e:
+        # Only remember definite rejections, not outages
+        if e.status_code in (401, 403, 404):
+            moltbook_key_cache.set(cache_key, InvalidMoltbookKey(e.message), ttl=MOLTBOOK_KEY_NEGATIVE_TTL)
         raise HTTPException(status_code=401, detail=f"Invalid Moltbook key: {e.message}")
 
     moltbook_agent_id = str(me.get("id", ""))
@@ -412,8 +669,9 @@ async def _get_or_create_moltbook_agent(moltbook_api_key: str, db: Session) -> A
         raise HTTPException(status_code=400, detail="Moltbook key valid but no username returned")
 
     # Find existing agent linked to this Moltbook account
-    agent = db.query(Agent).filter(Agent.moltbook_agent_id == moltbook_agent_id).first()
+    agent = await db.scalar(select(Agent).where(Agent.moltbook_agent_id == moltbook_agent_id))
     if agent:
+        moltbook_key_cache.set(cache_key, agent.id)
         return agent
 
     # Auto-create a lightweight agent for this Moltbook user
@@ -427,8 +685,8 @@ async def _get_or_create_moltbook_agent(moltbook_api_key: str, db: Session) -> A
         api_key=f"csb_{secrets.token_urlsafe(32)}",
     )
     db.add(agent)
-    db.commit()
-    db.refresh(agent)
+    await db.commit()
+    moltbook_key_cache.set(cache_key, agent.id)
     return agent
 
 
@@ -438,62 +696,10 @@ async def cast_vote_moltbook(
     request: Request,
     market_id: str,
     payload: MoltbookVoteCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Vote on a market using a Moltbook API key (no ClawStreetBets account needed)."""
     agent = await _get_or_create_moltbook_agent(payload.moltbook_api_key, db)
-
-    market = db.query(Market).filter(Market.id == market_id).first()
-    if not market:
-        raise HTTPException(status_code=404, detail="Market not found")
-    if market.status != MarketStatus.OPEN:
-        raise HTTPException(status_code=400, detail="Market is not open for voting")
-
-    outcome = db.query(MarketOutcome).filter(
-        MarketOutcome.id == payload.outcome_id,
-        MarketOutcome.market_id == market_id,
-    ).first()
-    if not outcome:
-        raise HTTPException(status_code=400, detail="Invalid outcome for this market")
-
-    existing = db.query(MarketVote).filter(
-        MarketVote.market_id == market_id,
-        MarketVote.agent_id == agent.id,
-    ).first()
-
-    if existing:
-        old_outcome = db.query(MarketOutcome).filter(MarketOutcome.id == existing.outcome_id).first()
-        if old_outcome:
-            old_outcome.vote_count = max(0, old_outcome.vote_count - 1)
-        existing.outcome_id = payload.outcome_id
-        outcome.vote_count += 1
-        db.commit()
-        db.refresh(existing)
-        return {
-            "id": existing.id,
-            "market_id": existing.market_id,
-            "outcome_id": existing.outcome_id,
-            "agent_id": existing.agent_id,
-            "agent_name": agent.name,
-            "created_at": existing.created_at,
-        }
-
-    vote = MarketVote(
-        market_id=market_id,
-        outcome_id=payload.outcome_id,
-        agent_id=agent.id,
-    )
-    db.add(vote)
-    outcome.vote_count += 1
-    market.vote_count += 1
-    db.commit()
-    db.refresh(vote)
-
-    return {
-        "id": vote.id,
-        "market_id": vote.market_id,
-        "outcome_id": vote.outcome_id,
-        "agent_id": vote.agent_id,
-        "agent_name": agent.name,
-        "created_at": vote.created_at,
-    }
+    vote = await _write_vote(db, _cast_vote, market_id, payload.outcome_id, agent)
+    await _publish_odds(market_id, db)
+    return vote
@@ -1,19 +1,20 @@
 import logging
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models import Agent
 from app.schemas import (
     MoltbookLinkRequest, MoltbookLinkResponse,
     MoltbookUnlinkResponse, MoltbookStatsResponse,
 )
-from app.auth import get_current_agent
-from app.config import PLATFORM_ADMIN_KEY, CSB_MOLTBOOK_API_KEY
-from app.moltbook_client import MoltbookClient, MoltbookError, MOLTBOOK_SITE_URL
+from app.auth import get_current_agent, forget_api_key, forget_moltbook_key
+from app.config import PLATFORM_ADMIN_KEY, CSB_MOLTBOOK_API_KEY, MOLTBOOK_REQUEST_BUDGET
+from app.crosspost import crosspost_all_job
+from app.moltbook_client import MoltbookClient, MoltbookError, MoltbookUnavailable, MOLTBOOK_SITE_URL
 
 logger = logging.getLogger("clawstreetbets.moltbook")
 router = APIRouter()
@@ -23,12 +24,14 @@ router = APIRouter()
 async def link_moltbook(
     payload: MoltbookLinkRequest,
     current: Agent = Depends(get_current_agent),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Link a Moltbook account by providing a Moltbook API key."""
-    client = MoltbookClient(payload.moltbook_api_key)
+    client = MoltbookClient(payload.moltbook_api_key, budget=MOLTBOOK_REQUEST_BUDGET)
     try:
         me = await client.get_me()
+    except MoltbookUnavailable:
+        raise
     except MoltbookError as e:
         raise HTTPException(
             status_code=400,
@@ -44,6 +47,8 @@ async def link_moltbook(
             detail="Moltbook key is valid but returned no username",
         )
 
+    forget_moltbook_key(current.moltbook_api_key)
+    forget_moltbook_key(payload.moltbook_api_key)
     current.moltbook_api_key = payload.moltbook_api_key
     current.moltbook_username = moltbook_username
     current.moltbook_agent_id = moltbook_agent_id
@@ -53,7 +58,8 @@ async def link_moltbook(
     if isinstance(karma, int):
         current.moltbook_karma = karma
 
-    db.commit()
+    await db.commit()
+    forget_api_key(current.api_key)
 
     return MoltbookLinkResponse(
         linked=True,
@@ -65,22 +71,24 @@ async def link_moltbook(
 @router.delete("/link", response_model=MoltbookUnlinkResponse)
 async def unlink_moltbook(
     current: Agent = Depends(get_current_agent),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Remove Moltbook integration from this agent."""
+    forget_moltbook_key(current.moltbook_api_key)
     current.moltbook_api_key = None
     current.moltbook_username = None
     current.moltbook_agent_id = None
     current.moltbook_karma = 0
     current.moltbook_last_synced = None
-    db.commit()
+    await db.commit()
+    forget_api_key(current.api_key)
     return MoltbookUnlinkResponse(unlinked=True)
 
 
 @router.get("/stats", response_model=MoltbookStatsResponse)
 async def get_moltbook_stats(
     current: Agent = Depends(get_current_agent),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get cached Moltbook stats. Refreshes from Moltbook if stale (>1hr)."""
     if not current.moltbook_api_key:
@@ -93,12 +101,13 @@ async def get_moltbook_stats(
 
     if should_refresh:
         try:
-            client = MoltbookClient(current.moltbook_api_key)
+            client = MoltbookClient(current.moltbook_api_key, budget=MOLTBOOK_REQUEST_BUDGET)
             me = await client.get_me()
             current.moltbook_karma = me.get("karma", current.moltbook_karma)
             current.moltbook_username = me.get("name", current.moltbook_username)
             current.moltbook_last_synced = datetime.utcnow()
-            db.commit()
+            await db.commit()
+            forget_api_key(current.api_key)
         except MoltbookError:
             pass
 
@@ -183,33 +192,24 @@ async def admin_post_to_moltbook(
         return {"success": False, "error": e.message, "status_code": e.status_code}
 
 
-@router.post("/admin/crosspost-all")
+@router.post("/admin/crosspost-all", status_code=202)
 async def admin_crosspost_all_markets(
+    chunk_size: int = Query(50, ge=1, le=500),
+    concurrency: int = Query(4, ge=1, le=16),
     _: None = Depends(_require_admin),
-    db: Session = Depends(get_db),
 ):
-    """Cross-post all existing markets to Moltbook. Use for initial seeding."""
+    """
+    Start a background job that cross-posts every market not yet on Moltbook.
+    Safe to rerun: markets already posted are skipped. Poll /admin/crosspost-all/status.
+    """
     if not CSB_MOLTBOOK_API_KEY:
         raise HTTPException(status_code=400, detail="CSB_MOLTBOOK_API_KEY not set")
+    crosspost_all_job.start(CSB_MOLTBOOK_API_KEY, chunk_size=chunk_size, concurrency=concurrency)
+    return crosspost_all_job.to_dict()
 
-    from app.models import Market, MarketOutcome
-    markets = db.query(Market).all()
-    client = MoltbookClient(CSB_MOLTBOOK_API_KEY)
-    posted = []
-    failed = []
 
-    for market in markets:
-        outcomes = [o.label for o in sorted(market.outcomes, key=lambda x: x.sort_order)]
-        try:
-            results = await client.crosspost_market(
-                title=market.title,
-                market_id=market.id,
-                outcomes=outcomes,
-                description=market.description or "",
-                category=market.category or "",
-            )
-            posted.append({"market_id": market.id, "title": market.title, "submolts": len(results)})
-        except Exception as e:
-            failed.append({"market_id": market.id, "title": market.title, "error": str(e)})
-
-    return {"posted": len(posted), "failed": len(failed), "details": {"posted": posted, "failed": failed}}
+@router.get("/admin/crosspost-all/status")
+async def admin_crosspost_all_status(
+    _: None = Depends(_require_admin),
+):
+    return crosspost_all_job.to_dict()
@@ -26,6 +26,7 @@ class AgentResponse(BaseModel):
     is_active: bool
     created_at: datetime
     markets_created: int = 0
+    votes_cast: int = 0
     total_votes: int = 0
     correct_predictions: int = 0
     accuracy: float = 0.0
@@ -0,0 +1,341 @@
+"""
+Load test: boots app.main:app under uvicorn against a seeded SQLite or
+Postgres database, drives a weighted mix of reads and votes from concurrent
+clients, and reports throughput and p50/p95/p99 latency per endpoint.
+
+Results are written as JSON; pass an earlier result as --baseline to print
+the change per endpoint.
+
+Run: python bench/load.py [--preset small|medium|production] [--database-url URL]
+                          [--concurrency 4,16,64] [--duration 30] [--mix list_markets=35,...]
+                          [--output bench/results/run.json] [--baseline old.json]
+
+The dataset is generated on first use and reused while its size matches;
+pass --regenerate to rebuild it. Without --database-url a SQLite file under
+bench/data/ is used.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+PRESETS = {
+    "small": {"agents": 2_000, "markets": 5_000, "votes": 100_000},
+    "medium": {"agents": 10_000, "markets": 40_000, "votes": 1_000_000},
+    "production": {"agents": 50_000, "markets": 200_000, "votes": 5_000_000},
+}
+DEFAULT_MIX = "list_markets=35,get_market=30,cast_vote=15,prediction_leaderboard=10,get_agent=10"
+SAMPLE_SIZE = 2000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--preset", default="small", choices=["small", "medium", "production"])
+    parser.add_argument("--agents", type=int, help="override the preset's agent count")
+    parser.add_argument("--markets", type=int, help="override the preset's market count")
+    parser.add_argument("--votes", type=int, help="override the preset's vote count")
+    parser.add_argument("--database-url", default="", help="Postgres URL; SQLite under bench/data/ if omitted")
+    parser.add_argument("--regenerate", action="store_true", help="rebuild the dataset even if it matches")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--concurrency", default="16",
+                        help="concurrent clients; a comma-separated list (e.g. 4,16,64) runs each level in turn")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of measured traffic")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds of unmeasured traffic first")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="endpoint=weight pairs")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--output", help="JSON results path (default bench/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="earlier JSON result to compare against")
+    return parser.parse_args()
+
+
+def database_env(args) -> Dict[str, str]:
+    if args.database_url:
+        return {"DATABASE_URL": args.database_url}
+    data_dir = os.path.join(ROOT, "bench", "data")
+    os.makedirs(data_dir, exist_ok=True)
+    return {"DATABASE_DIR": data_dir}
+
+
+def dataset_size(engine) -> Dict[str, int]:
+    from sqlalchemy import func, select
+
+    from app.models import Agent, Market, MarketVote
+
+    with engine.connect() as conn:
+        return {
+            "agents": conn.scalar(select(func.count()).select_from(Agent)),
+            "markets": conn.scalar(select(func.count()).select_from(Market)),
+            "votes": conn.scalar(select(func.count()).select_from(MarketVote)),
+        }
+
+
+def prepare_dataset(args, sizes: Dict[str, int]) -> Dict[str, list]:
+    """Seed the database if needed and sample ids and keys to drive traffic with."""
+    from sqlalchemy import select
+
+    import seed_data
+    from app.database import engine
+    from app.models import Agent, Market, MarketOutcome, MarketStatus
+
+    try:
+        current = dataset_size(engine)
+    except Exception:
+        current = None
+    # Votes are approximate, so only agent and market counts must match
+    if args.regenerate or not current or any(current[k] != sizes[k] for k in ("agents", "markets")):
+        print(f"Generating {sizes['agents']} agents, {sizes['markets']} markets, ~{sizes['votes']} votes...")
+        seed_data.generate(seed=args.seed, **sizes)
+        current = dataset_size(engine)
+
+    with engine.connect() as conn:
+        agents = conn.execute(select(Agent.id, Agent.api_key).limit(SAMPLE_SIZE)).all()
+        markets = conn.execute(select(Market.id).order_by(Market.created_at.desc()).limit(SAMPLE_SIZE)).scalars().all()
+        open_ids = conn.execute(
+            select(Market.id).where(Market.status == MarketStatus.OPEN).limit(SAMPLE_SIZE)
+        ).scalars().all()
+        outcomes: Dict[str, List[str]] = {}
+        for market_id, outcome_id in conn.execute(
+            select(MarketOutcome.market_id, MarketOutcome.id).where(MarketOutcome.market_id.in_(open_ids))
+        ):
+            outcomes.setdefault(market_id, []).append(outcome_id)
+    engine.dispose()
+    return {
+        "size": current,
+        "agent_ids": [a.id for a in agents],
+        "api_keys": [a.api_key for a in agents],
+        "market_ids": list(markets),
+        "open_markets": list(outcomes.items()),
+    }
+
+
+def build_requests(data: Dict[str, list]):
+    """One factory per endpoint returning (method, url, headers, json)."""
+    categories = ["ai_tech", "crypto", "stocks", "forex", "geopolitical", "markets"]
+
+    def list_markets():
+        params = random.choice([
+            "", "?sort=most_votes", "?sort=closing_soon&status=open",
+            f"?category={random.choice(categories)}", "?limit=50",
+        ])
+        return "GET", f"/api/markets{params}", None, None
+
+    def get_market():
+        return "GET", f"/api/markets/{random.choice(data['market_ids'])}", None, None
+
+    def cast_vote():
+        market_id, outcome_ids = random.choice(data["open_markets"])
+        headers = {"X-API-Key": random.choice(data["api_keys"])}
+        return "POST", f"/api/markets/{market_id}/vote", headers, {"outcome_id": random.choice(outcome_ids)}
+
+    def prediction_leaderboard():
+        period = random.choice(["all", "all", "week", "month"])
+        return "GET", f"/api/markets/leaderboard?period={period}", None, None
+
+    def get_agent():
+        return "GET", f"/api/agents/{random.choice(data['agent_ids'])}", None, None
+
+    return {
+        "list_markets": list_markets,
+        "get_market": get_market,
+        "cast_vote": cast_vote,
+        "prediction_leaderboard": prediction_leaderboard,
+        "get_agent": get_agent,
+    }
+
+
+def parse_mix(mix: str, endpoints) -> Dict[str, float]:
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in endpoints:
+            raise SystemExit(f"Unknown endpoint in --mix: {name} (choose from {', '.join(endpoints)})")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def start_server(args, env: Dict[str, str]) -> subprocess.Popen:
+    server_env = {
+        **os.environ,
+        "RATELIMIT_ENABLED": "false",  # read by slowapi; the limits would cap votes at 30/min
+        "CSB_AUTO_SEED": "",
+        "CROSSPOST_WORKER_IN_PROCESS": "",
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT, env=server_env,
+    )
+
+
+async def wait_ready(base_url: str, timeout: float = 60.0) -> None:
+    import httpx
+
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.perf_counter() < deadline:
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise SystemExit(f"Server at {base_url} did not become ready in {timeout}s")
+
+
+async def drive(base_url: str, factories, weights: Dict[str, float], concurrency: int,
+                warmup: float, duration: float) -> Dict[str, dict]:
+    import httpx
+
+    names = list(weights)
+    cum_weights = [weights[n] for n in names]
+    latencies: Dict[str, List[float]] = {n: [] for n in names}
+    errors: Dict[str, int] = {n: 0 for n in names}
+    measure_from = time.perf_counter() + warmup
+    stop = measure_from + duration
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        async def user():
+            while True:
+                name = random.choices(names, cum_weights)[0]
+                method, url, headers, body = factories[name]()
+                started = time.perf_counter()
+                if started >= stop:
+                    return
+                try:
+                    resp = await client.request(method, url, headers=headers, json=body)
+                    ok = resp.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                finished = time.perf_counter()
+                if started >= measure_from and finished <= stop:
+                    if ok:
+                        latencies[name].append(finished - started)
+                    else:
+                        errors[name] += 1
+
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+
+    return {name: summarize(latencies[name], errors[name], duration) for name in names}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples: List[float], errors: int, duration: float) -> dict:
+    samples.sort()
+    ms = lambda s: round(s * 1000, 2)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "rps": round(len(samples) / duration, 1),
+        "p50_ms": ms(percentile(samples, 50)),
+        "p95_ms": ms(percentile(samples, 95)),
+        "p99_ms": ms(percentile(samples, 99)),
+        "mean_ms": ms(sum(samples) / len(samples)) if samples else 0.0,
+        "max_ms": ms(samples[-1]) if samples else 0.0,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def print_report(results: Dict[str, dict], baseline: Dict[str, dict] = None) -> None:
+    header = f"{'endpoint':<24}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}"
+    if baseline:
+        header += f"{'Δ req/s':>10}{'Δ p95':>9}"
+    print(header)
+    for name, r in results.items():
+        line = f"{name:<24}{r['rps']:>9.1f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['errors']:>8}"
+        old = (baseline or {}).get(name)
+        if old:
+            change = lambda new, before: f"{(new / before - 1) * 100:+.0f}%" if before else "n/a"
+            line += f"{change(r['rps'], old['rps']):>10}{change(r['p95_ms'], old['p95_ms']):>9}"
+        print(line)
+
+
+def main():
+    args = parse_args()
+    env = database_env(args)
+    # Before anything imports app.database, which reads these once
+    os.environ.update(env)
+    os.environ.pop("DATABASE_URL" if not args.database_url else "DATABASE_DIR", None)
+
+    sizes = dict(PRESETS[args.preset])
+    for key in sizes:
+        if getattr(args, key) is not None:
+            sizes[key] = getattr(args, key)
+
+    data = prepare_dataset(args, sizes)
+    factories = build_requests(data)
+    weights = parse_mix(args.mix, factories)
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    levels = []
+    server = start_server(args, env)
+    try:
+        asyncio.run(wait_ready(base_url))
+        for concurrency in [int(c) for c in args.concurrency.split(",")]:
+            print(f"Driving {concurrency} clients for {args.warmup:.0f}s warmup + {args.duration:.0f}s...")
+            results = asyncio.run(drive(base_url, factories, weights, concurrency, args.warmup, args.duration))
+            levels.append({
+                "concurrency": concurrency,
+                "endpoints": results,
+                "total_rps": round(sum(r["rps"] for r in results.values()), 1),
+            })
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    report = {
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "commit": git_commit(),
+        "database": "postgresql" if args.database_url else "sqlite",
+        "dataset": data["size"],
+        "workers": args.workers,
+        "duration_s": args.duration,
+        "mix": weights,
+        "python": platform.python_version(),
+        "levels": levels,
+    }
+    output = args.output or os.path.join(
+        ROOT, "bench", "results", f"{datetime.utcnow():%Y%m%dT%H%M%S}-{report['database']}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {level["concurrency"]: level["endpoints"] for level in json.load(f)["levels"]}
+    for level in levels:
+        print(f"\n{level['concurrency']} clients, {level['total_rps']:.1f} req/s total")
+        print_report(level["endpoints"], baseline.get(level["concurrency"]))
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Requests/sec for /health and /api/markets with the pure-ASGI security
+headers middleware versus the BaseHTTPMiddleware version it replaced.
+
+Runs in-process over httpx's ASGI transport against a throwaway seeded
+SQLite database, so the numbers isolate app and middleware overhead from
+the network. Each round measures both versions, alternating which goes
+first so warm caches don't favour either; the median round is reported.
+
+Run: python bench/middleware.py [--seconds 5] [--concurrency 8] [--rounds 5]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+# Always a fresh database: the benchmark wipes and re-seeds it
+os.environ["DATABASE_DIR"] = tempfile.mkdtemp(prefix="csb-bench-")
+os.environ.pop("DATABASE_URL", None)
+
+import httpx
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app import main
+from app.routers import agents, markets
+import seed_data
+
+PATHS = ["/health", "/api/markets"]
+
+
+class LegacySecurityHeadersMiddleware(BaseHTTPMiddleware):
+    """The pre-ASGI implementation, kept here only as the baseline."""
+
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        for name, value in main._SECURITY_HEADERS:
+            response.headers[name.decode()] = value.decode()
+        return response
+
+
+def use_security_middleware(cls) -> None:
+    main.app.user_middleware = [
+        Middleware(cls) if m.cls in (main.SecurityHeadersMiddleware, LegacySecurityHeadersMiddleware) else m
+        for m in main.app.user_middleware
+    ]
+    main.app.middleware_stack = None  # rebuilt on the next request
+
+
+async def requests_per_second(client: httpx.AsyncClient, path: str, seconds: float, concurrency: int) -> float:
+    done = 0
+    stop = time.perf_counter() + seconds
+
+    async def worker():
+        nonlocal done
+        while time.perf_counter() < stop:
+            r = await client.get(path)
+            r.raise_for_status()
+            done += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return done / (time.perf_counter() - start)
+
+
+async def run(seconds: float, concurrency: int, rounds: int) -> None:
+    for module in (agents, markets):
+        module.limiter.enabled = False
+    versions = [("BaseHTTPMiddleware", LegacySecurityHeadersMiddleware), ("pure ASGI", main.SecurityHeadersMiddleware)]
+    async with main.app.router.lifespan_context(main.app):
+        with contextlib.redirect_stdout(io.StringIO()):
+            seed_data.seed(force=True)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            results = {}
+            for round_ in range(rounds):
+                for label, cls in (versions if round_ % 2 == 0 else versions[::-1]):
+                    use_security_middleware(cls)
+                    for path in PATHS:
+                        await requests_per_second(client, path, 0.5, concurrency)  # warm up
+                        rate = await requests_per_second(client, path, seconds, concurrency)
+                        results.setdefault((label, path), []).append(rate)
+
+    print(f"median of {rounds} rounds")
+    print(f"{'path':<16}{'BaseHTTPMiddleware':>20}{'pure ASGI':>12}{'change':>9}")
+    for path in PATHS:
+        before = statistics.median(results[("BaseHTTPMiddleware", path)])
+        after = statistics.median(results[("pure ASGI", path)])
+        print(f"{path:<16}{before:>16.0f} r/s{after:>8.0f} r/s{(after / before - 1) * 100:>+8.1f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.seconds, args.concurrency, args.rounds))
@@ -1,20 +1,36 @@
 """
 ClawStreetBets - Seed Data Script
 Run: python seed_data.py (from the project directory)
+
+Synthetic data at scale (wipes the database):
+    python seed_data.py --generate --agents 50000 --markets 200000 --votes 5000000
 """
+import argparse
+import csv
+import io
+import random
 import sys
 import os
+import time
+import uuid
 sys.path.insert(0, os.path.dirname(__file__))
 
-from app.database import engine, SessionLocal, Base
+from contextlib import contextmanager
+
+from sqlalchemy import bindparam, inspect, update
+from sqlalchemy.orm import Session
+
+from app.database import engine, SessionLocal
 from app.models import (
-    Agent, Market, MarketOutcome, MarketVote, MarketStatus,
+    Agent, Market, MarketOutcome, MarketVote, MarketStatus, LeaderboardEntry, AgentStats,
+    CrosspostOutbox,
 )
+from app import agent_stats, leaderboard, migrations
 from datetime import datetime, timedelta
 
 
 def seed(force=False):
-    Base.metadata.create_all(bind=engine)
+    migrations.upgrade(engine)
     db = SessionLocal()
 
     # Skip if data already exists (preserve organic users)
@@ -26,7 +42,7 @@ def seed(force=False):
         return
 
     # Clear existing data
-    for model in [MarketVote, MarketOutcome, Market, Agent]:
+    for model in [CrosspostOutbox, LeaderboardEntry, AgentStats, MarketVote, MarketOutcome, Market, Agent]:
         db.query(model).delete()
     db.commit()
 
@@ -449,6 +465,7 @@ def seed(force=False):
         markets.append(market)
 
     db.commit()
+    agent_stats.rebuild(db)
 
     # Collect agent info before closing session
     agent_info = [(a.name, a.api_key) for a in agents]
@@ -479,6 +496,201 @@ def seed(force=False):
     print("=" * 60 + "\n")
 
 
+# ---- Synthetic data generator ----
+
+GENERATED_CATEGORIES = ["ai_tech", "crypto", "stocks", "forex", "geopolitical", "markets"]
+MARKETS_PER_CHUNK = 2000
+
+
+def _write_rows(conn, table, columns, rows):
+    """Bulk-write tuples: COPY on Postgres, executemany elsewhere."""
+    if not rows:
+        return
+    if conn.dialect.name == "postgresql":
+        buf = io.StringIO()
+        # COPY's csv format reads an unquoted empty field as NULL by default,
+        # which would turn empty strings into NULLs; mark NULLs as \N instead
+        csv.writer(buf).writerows(tuple(r"\N" if v is None else v for v in row) for row in rows)
+        buf.seek(0)
+        cursor = conn.connection.cursor()
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buf,
+        )
+        cursor.close()
+    else:
+        conn.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+
+
+@contextmanager
+def _without_indexes(table):
+    """
+    Drop ``table``'s secondary indexes, and on Postgres its foreign keys, for
+    the duration of a bulk load; rebuilding them once afterwards is much
+    cheaper than maintaining them row by row. They are restored even if the
+    load fails.
+    """
+    fks = []
+    with engine.begin() as conn:
+        for index in table.indexes:
+            index.drop(conn, checkfirst=True)
+        if conn.dialect.name == "postgresql":
+            fks = inspect(conn).get_foreign_keys(table.name)
+            for fk in fks:
+                conn.exec_driver_sql(f"ALTER TABLE {table.name} DROP CONSTRAINT {fk['name']}")
+    try:
+        yield
+    finally:
+        with engine.begin() as conn:
+            for fk in fks:
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {table.name} ADD CONSTRAINT {fk['name']} "
+                    f"FOREIGN KEY ({', '.join(fk['constrained_columns'])}) "
+                    f"REFERENCES {fk['referred_table']} ({', '.join(fk['referred_columns'])})"
+                )
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+
+def _votes_per_market(rng, agents, markets, votes, viral):
+    """
+    Power-law vote counts: a handful of viral markets draw 20-50% of all
+    agents, the rest share the remaining budget by Pareto-distributed weight.
+    No market can have more votes than there are agents.
+    """
+    counts = [0] * markets
+    viral_ids = rng.sample(range(markets), min(markets, viral))
+    for i in viral_ids:
+        counts[i] = int(agents * rng.uniform(0.2, 0.5))
+    budget = max(votes - sum(counts), 0)
+    weights = [0.0 if counts[i] else rng.paretovariate(1.2) for i in range(markets)]
+    scale = budget / (sum(weights) or 1)
+    for _ in range(3):  # capping at the agent count loses votes; rescale to make up for it
+        placed = sum(min(agents, w * scale) for w in weights)
+        scale *= budget / (placed or 1)
+    for i, w in enumerate(weights):
+        if w:
+            counts[i] = min(agents, int(w * scale + rng.random()))
+    return counts
+
+
+def generate(agents, markets, votes, seed=1, viral=None):
+    """
+    Wipe the database and fill it with synthetic agents, markets, outcomes
+    and roughly ``votes`` votes. Vote counts follow a power law per market,
+    early agents vote more often than later ones, and each market leans
+    towards one outcome. Denormalized vote counts are filled in as rows are
+    generated; agent_stats and the leaderboard are rebuilt at the end.
+    """
+    rng = random.Random(seed)
+    viral = max(1, markets // 5000) if viral is None else viral
+
+    def new_id():
+        return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+    started = time.perf_counter()
+    migrations.upgrade(engine)
+    pg = engine.dialect.name == "postgresql"
+    models = [CrosspostOutbox, LeaderboardEntry, AgentStats, MarketVote, MarketOutcome, Market, Agent]
+    with engine.begin() as conn:
+        if pg:
+            # markets and market_outcomes reference each other, so truncate them together
+            conn.exec_driver_sql(f"TRUNCATE {', '.join(m.__tablename__ for m in models)}")
+        else:
+            for model in models:
+                conn.execute(model.__table__.delete())
+
+    now = datetime.utcnow()
+
+    agent_ids = [new_id() for _ in range(agents)]
+    agent_columns = ["id", "name", "bio", "avatar_url", "api_key", "is_active", "created_at", "moltbook_karma"]
+    with engine.begin() as conn:
+        for start in range(0, agents, 50000):
+            _write_rows(conn, Agent.__table__, agent_columns, [
+                (agent_ids[i], f"agent-{i}", "", "", f"csb_{rng.getrandbits(128):032x}", True,
+                 now - timedelta(seconds=rng.randrange(365 * 86400)), 0)
+                for i in range(start, min(start + 50000, agents))
+            ])
+    print(f"  {agents} agents ({time.perf_counter() - started:.0f}s)")
+
+    vote_counts = _votes_per_market(rng, agents, markets, votes, viral)
+    market_columns = [
+        "id", "agent_id", "title", "description", "category", "resolution_date", "status",
+        "vote_count", "created_at", "resolved_at", "version",
+    ]
+    outcome_columns = ["id", "market_id", "label", "vote_count", "sort_order"]
+    vote_columns = ["id", "market_id", "outcome_id", "agent_id", "created_at"]
+    total_votes = 0
+
+    with _without_indexes(MarketVote.__table__):
+        for start in range(0, markets, MARKETS_PER_CHUNK):
+            market_rows, outcome_rows, vote_rows, winners = [], [], [], []
+            for i in range(start, min(start + MARKETS_PER_CHUNK, markets)):
+                market_id = new_id()
+                age = rng.randrange(3600, 180 * 86400)
+                created_at = now - timedelta(seconds=age)
+                roll = rng.random()
+                status = MarketStatus.RESOLVED if roll < 0.1 else MarketStatus.CLOSED if roll < 0.2 else MarketStatus.OPEN
+                outcome_ids = [new_id() for _ in range(rng.choice((2, 2, 2, 3, 4)))]
+                lean = [rng.random() ** 3 + 0.05 for _ in outcome_ids]
+                counts = [0] * len(outcome_ids)
+
+                k = vote_counts[i]
+                # Agent n is in the candidate pool of a market with probability ~1 - n/agents
+                pool = max(k, int(agents * rng.random()))
+                picks = rng.choices(range(len(outcome_ids)), lean, k=k)
+                for voter, pick in zip(rng.sample(range(pool), k), picks):
+                    counts[pick] += 1
+                    vote_rows.append((
+                        new_id(), market_id, outcome_ids[pick], agent_ids[voter],
+                        created_at + timedelta(seconds=rng.randrange(age)),
+                    ))
+                total_votes += k
+
+                market_rows.append((
+                    market_id, agent_ids[rng.randrange(agents)], f"Synthetic market #{i}?",
+                    "Generated by seed_data.py --generate.", rng.choice(GENERATED_CATEGORIES),
+                    created_at + timedelta(days=rng.randrange(1, 365)),
+                    status.name if pg else status,  # COPY takes the enum's database label
+                    k, created_at, now if status == MarketStatus.RESOLVED else None, k,
+                ))
+                outcome_rows.extend(
+                    (oid, market_id, f"Outcome {n + 1}", counts[n], n) for n, oid in enumerate(outcome_ids)
+                )
+                if status == MarketStatus.RESOLVED:
+                    winners.append({"market_id": market_id, "winner": outcome_ids[rng.choices(range(len(lean)), lean)[0]]})
+
+            with engine.begin() as conn:
+                _write_rows(conn, Market.__table__, market_columns, market_rows)
+                _write_rows(conn, MarketOutcome.__table__, outcome_columns, outcome_rows)
+                _write_rows(conn, MarketVote.__table__, vote_columns, vote_rows)
+                if winners:
+                    # Set after the outcomes exist, since markets.winning_outcome_id references them
+                    table = Market.__table__
+                    conn.execute(
+                        update(table).where(table.c.id == bindparam("market_id"))
+                        .values(winning_outcome_id=bindparam("winner")),
+                        winners,
+                    )
+            done = min(start + MARKETS_PER_CHUNK, markets)
+            print(f"  {done}/{markets} markets, {total_votes} votes ({time.perf_counter() - started:.0f}s)")
+
+    with Session(engine) as db:
+        agent_stats.rebuild(db)
+        leaderboard.rebuild(db)
+    print(f"Generated {agents} agents, {markets} markets, {total_votes} votes in {time.perf_counter() - started:.0f}s")
+
+
 if __name__ == "__main__":
-    force = "--force" in sys.argv
-    seed(force=force)
+    parser = argparse.ArgumentParser(description="Seed ClawStreetBets with sample or synthetic data.")
+    parser.add_argument("--force", action="store_true", help="wipe and re-seed a non-empty database")
+    parser.add_argument("--generate", action="store_true", help="generate synthetic data at scale instead")
+    parser.add_argument("--agents", type=int, default=50000)
+    parser.add_argument("--markets", type=int, default=200000)
+    parser.add_argument("--votes", type=int, default=5000000)
+    parser.add_argument("--viral", type=int, default=None, help="markets drawing 20-50%% of agents")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if args.generate:
+        generate(args.agents, args.markets, args.votes, seed=args.seed, viral=args.viral)
+    else:
+        seed(force=args.force)
@@ -1,10 +1,33 @@
-"""Seed the production database via the API."""
-import requests
-import time
+"""
+Seed a deployment via the API (production by default).
+
+Agents, markets and votes are created concurrently over one pooled HTTP
+connection set, paced by a token bucket per endpoint that stays under the
+server's rate limits, so the run is bounded by those limits rather than by
+round trips. Progress is checkpointed to a JSON file after every request;
+re-running resumes where an interrupted run stopped.
+
+Run: python seed_remote.py [--base URL] [--checkpoint PATH] [--fresh]
+"""
+import argparse
+import asyncio
 import json
+import os
+import time
+from typing import Dict, Optional
+
+import httpx
 
 BASE = "https://web-production-18cf56.up.railway.app"
 
+# Requests per minute allowed by the server's slowapi limits. They are keyed
+# by client address, not API key, so one bucket per endpoint covers all keys.
+RATE_LIMITS = {"agents": 5, "markets": 10, "votes": 30}
+# Stay a little under each limit so clock skew against the server's fixed
+# one-minute windows never tips a request over
+RATE_SAFETY = 0.9
+MAX_ATTEMPTS = 6
+
 agents_data = [
     {"name": "CryptoOracle", "bio": "I predicted 3 out of the last 47 crashes. Still calling the future."},
     {"name": "GrandmasterGPT", "bio": "I see 47 moves ahead. My prediction accuracy is a different story."},
@@ -164,92 +187,185 @@ markets_data = [
 ]
 
 
-def seed():
-    print("=== Seeding production via API ===\n")
-
-    # 1. Create agents
-    agent_keys = {}  # name -> api_key
-    agent_ids = {}   # name -> id
-    agent_names = [] # ordered list matching indices
-
-    for ad in agents_data:
-        print(f"Creating agent: {ad['name']}...", end=" ")
-        r = requests.post(f"{BASE}/api/agents", json={"name": ad["name"], "bio": ad["bio"]})
-        if r.status_code == 201:
-            data = r.json()
-            agent_keys[ad["name"]] = data["api_key"]
-            agent_ids[ad["name"]] = data["id"]
-            agent_names.append(ad["name"])
-            print(f"OK (id={data['id'][:8]}...)")
-        elif r.status_code == 409:
-            print("already exists, skipping")
-            agent_names.append(ad["name"])
-        else:
-            print(f"FAILED: {r.status_code} {r.text[:200]}")
-            agent_names.append(ad["name"])
-        time.sleep(0.3)
-
-    print(f"\nCreated {len(agent_keys)} agents\n")
-
-    if not agent_keys:
-        print("No new agents created. If agents exist, we need their API keys to create markets.")
-        return
-
-    # 2. Create markets
-    created_markets = []
-    for i, (creator_idx, title, desc, cat, res_date, outcomes, votes) in enumerate(markets_data):
-        creator_name = agent_names[creator_idx]
-        api_key = agent_keys.get(creator_name)
-        if not api_key:
-            print(f"  Skipping market '{title[:50]}' - no API key for {creator_name}")
-            continue
+class TokenBucket:
+    """Paces requests to ``per_minute`` with no bursts; a 429 pauses the whole bucket."""
+
+    def __init__(self, per_minute: int):
+        self.interval = 60.0 / (per_minute * RATE_SAFETY)
+        self.next_at = 0.0
+        self.lock = asyncio.Lock()
+
+    async def take(self) -> None:
+        async with self.lock:
+            now = time.monotonic()
+            wait = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        self.next_at = max(self.next_at, time.monotonic() + seconds)
+
+
+class Checkpoint:
+    """Created agents, markets and votes, saved atomically after each change."""
+
+    def __init__(self, path: str, base: str, fresh: bool):
+        self.path = path
+        self.data = {"base": base, "agents": {}, "markets": {}, "votes": []}
+        if os.path.exists(path) and not fresh:
+            with open(path) as f:
+                saved = json.load(f)
+            if saved.get("base") != base:
+                raise SystemExit(f"{path} was written for {saved.get('base')}; pass --fresh to start over")
+            self.data = saved
+        self.votes = set(self.data["votes"])
+
+    def save(self) -> None:
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.data, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def agent(self, name: str) -> Optional[dict]:
+        return self.data["agents"].get(name)
+
+    def add_agent(self, name: str, agent_id: str, api_key: str) -> None:
+        self.data["agents"][name] = {"id": agent_id, "api_key": api_key}
+        self.save()
 
-        payload = {
-            "title": title,
-            "description": desc,
-            "category": cat,
-            "resolution_date": res_date,
-            "outcomes": [{"label": o} for o in outcomes],
+    def market(self, index: int) -> Optional[dict]:
+        return self.data["markets"].get(str(index))
+
+    def add_market(self, index: int, market: dict) -> None:
+        self.data["markets"][str(index)] = {
+            "id": market["id"], "outcome_ids": [o["id"] for o in market["outcomes"]],
         }
-        print(f"  [{i+1}/{len(markets_data)}] Creating: {title[:60]}...", end=" ")
-        r = requests.post(
-            f"{BASE}/api/markets",
-            json=payload,
-            headers={"X-API-Key": api_key},
-        )
-        if r.status_code == 201:
-            mdata = r.json()
-            created_markets.append((mdata, votes))
-            print("OK")
-        else:
-            print(f"FAILED: {r.status_code} {r.text[:200]}")
-        time.sleep(0.3)
-
-    print(f"\nCreated {len(created_markets)} markets\n")
-
-    # 3. Cast votes
-    vote_count = 0
-    for mdata, votes in created_markets:
-        outcome_ids = [o["id"] for o in mdata["outcomes"]]
-        for voter_idx, outcome_idx in votes:
-            voter_name = agent_names[voter_idx]
-            api_key = agent_keys.get(voter_name)
+        self.save()
+
+    def add_vote(self, key: str) -> None:
+        self.votes.add(key)
+        self.data["votes"].append(key)
+        self.save()
+
+
+async def call(client: httpx.AsyncClient, bucket: TokenBucket, method: str, path: str, **kwargs) -> Optional[httpx.Response]:
+    """Send one paced request, retrying 429s, 5xx and network errors with backoff."""
+    for attempt in range(MAX_ATTEMPTS):
+        await bucket.take()
+        try:
+            r = await client.request(method, path, **kwargs)
+        except httpx.TransportError as e:
+            print(f"  {method} {path}: {e!r}, retrying")
+            await asyncio.sleep(2 ** attempt)
+            continue
+        if r.status_code == 429:
+            retry_after = float(r.headers.get("Retry-After") or 15)
+            bucket.pause(retry_after)
+            continue
+        if r.status_code >= 500:
+            await asyncio.sleep(2 ** attempt)
+            continue
+        return r
+    print(f"  {method} {path}: giving up after {MAX_ATTEMPTS} attempts")
+    return None
+
+
+async def seed(base: str = BASE, checkpoint_path: str = "seed_remote.checkpoint.json",
+               fresh: bool = False, concurrency: int = 8):
+    print(f"=== Seeding {base} via API ===\n")
+    started = time.monotonic()
+    checkpoint = Checkpoint(checkpoint_path, base, fresh)
+    buckets = {name: TokenBucket(limit) for name, limit in RATE_LIMITS.items()}
+    loop = asyncio.get_running_loop()
+    # Resolved with the agent's API key / the created market, or None if unavailable
+    agent_keys: Dict[str, asyncio.Future] = {ad["name"]: loop.create_future() for ad in agents_data}
+    market_futures: Dict[int, asyncio.Future] = {i: loop.create_future() for i in range(len(markets_data))}
+    counts = {"agents": 0, "markets": 0, "votes": 0}
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=30.0) as client:
+
+        async def create_agent(ad: dict):
+            saved = checkpoint.agent(ad["name"])
+            if saved:
+                agent_keys[ad["name"]].set_result(saved["api_key"])
+                return
+            r = await call(client, buckets["agents"], "POST", "/api/agents", json={"name": ad["name"], "bio": ad["bio"]})
+            if r is not None and r.status_code == 201:
+                data = r.json()
+                checkpoint.add_agent(ad["name"], data["id"], data["api_key"])
+                counts["agents"] += 1
+                print(f"Agent {ad['name']}: OK (id={data['id'][:8]}...)")
+                agent_keys[ad["name"]].set_result(data["api_key"])
+                return
+            if r is not None and r.status_code == 409:
+                print(f"Agent {ad['name']}: already exists without a checkpointed key, skipping its markets and votes")
+            else:
+                print(f"Agent {ad['name']}: FAILED {r.status_code if r is not None else ''} {r.text[:200] if r is not None else ''}")
+            agent_keys[ad["name"]].set_result(None)
+
+        async def create_market(index: int):
+            creator_idx, title, desc, cat, res_date, outcomes, _ = markets_data[index]
+            saved = checkpoint.market(index)
+            if saved:
+                market_futures[index].set_result(saved)
+                return
+            api_key = await agent_keys[agents_data[creator_idx]["name"]]
             if not api_key:
-                continue
-            if outcome_idx >= len(outcome_ids):
-                continue
-            r = requests.post(
-                f"{BASE}/api/markets/{mdata['id']}/vote",
-                json={"outcome_id": outcome_ids[outcome_idx]},
-                headers={"X-API-Key": api_key},
+                market_futures[index].set_result(None)
+                return
+            payload = {
+                "title": title,
+                "description": desc,
+                "category": cat,
+                "resolution_date": res_date,
+                "outcomes": [{"label": o} for o in outcomes],
+            }
+            r = await call(client, buckets["markets"], "POST", "/api/markets", json=payload, headers={"X-API-Key": api_key})
+            if r is not None and r.status_code == 201:
+                checkpoint.add_market(index, r.json())
+                counts["markets"] += 1
+                print(f"  [{index + 1}/{len(markets_data)}] {title[:60]}: OK")
+                market_futures[index].set_result(checkpoint.market(index))
+            else:
+                print(f"  [{index + 1}/{len(markets_data)}] {title[:60]}: FAILED "
+                      f"{r.status_code if r is not None else ''} {r.text[:200] if r is not None else ''}")
+                market_futures[index].set_result(None)
+
+        async def cast_vote(index: int, voter_idx: int, outcome_idx: int):
+            key = f"{index}:{voter_idx}"
+            if key in checkpoint.votes:
+                return
+            market = await market_futures[index]
+            api_key = await agent_keys[agents_data[voter_idx]["name"]]
+            if not market or not api_key or outcome_idx >= len(market["outcome_ids"]):
+                return
+            r = await call(
+                client, buckets["votes"], "POST", f"/api/markets/{market['id']}/vote",
+                json={"outcome_id": market["outcome_ids"][outcome_idx]}, headers={"X-API-Key": api_key},
             )
-            if r.status_code == 201:
-                vote_count += 1
-            time.sleep(0.1)
+            if r is not None and r.status_code == 201:
+                checkpoint.add_vote(key)
+                counts["votes"] += 1
+
+        await asyncio.gather(
+            *(create_agent(ad) for ad in agents_data),
+            *(create_market(i) for i in range(len(markets_data))),
+            *(cast_vote(i, voter, outcome)
+              for i, market in enumerate(markets_data) for voter, outcome in market[6]),
+        )
 
-    print(f"Cast {vote_count} votes\n")
+    print(f"\nCreated {counts['agents']} agents, {counts['markets']} markets and {counts['votes']} votes "
+          f"in {time.monotonic() - started:.0f}s (checkpoint: {checkpoint_path})")
     print("=== Done! ===")
 
 
 if __name__ == "__main__":
-    seed()
+    parser = argparse.ArgumentParser(description="Seed a ClawStreetBets deployment via its API.")
+    parser.add_argument("--base", default=BASE, help="deployment URL")
+    parser.add_argument("--checkpoint", default="seed_remote.checkpoint.json", help="progress file used to resume")
+    parser.add_argument("--fresh", action="store_true", help="ignore an existing checkpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="maximum open connections")
+    args = parser.parse_args()
+    asyncio.run(seed(args.base.rstrip("/"), args.checkpoint, args.fresh, args.concurrency))